@@ -29,7 +29,10 @@ def create_app(config_class=Config):
     app.register_blueprint(admin_bp)
 
     with app.app_context():
+        from app.models import upgrade_schema, migrate_face_encodings
         db.create_all()
+        upgrade_schema()
+        migrate_face_encodings()
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
         os.makedirs(Config.BATCH_DIRECTORY, exist_ok=True)
 
@@ -1,8 +1,9 @@
-from flask import render_template, redirect, url_for, request, flash, jsonify, current_app
+from flask import render_template, redirect, url_for, request, flash, jsonify, current_app, Response
 from app import db
 from app.models import Employee, Attendance, Notification
 from app.services.db_service import DatabaseService
 from app.services.notification_service import NotificationService
+from app.services.sampling_profiler import SamplingProfiler
 from . import admin_bp
 from datetime import datetime, timedelta, timezone
 import os
@@ -391,3 +392,45 @@ def api_mark_all_notifications_read():
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
+
+@admin_bp.route('/api/streams', methods=['GET'])
+def api_stream_stats():
+    """API endpoint with per-camera MJPEG stream stats, including every connected viewer"""
+    stream_hubs = current_app.config.get('stream_hubs') or {}
+    return jsonify({'success': True,
+                    'streams': {camera_id: hub.stats() for camera_id, hub in stream_hubs.items()}})
+
+def _profiler():
+    """The process-wide sampling profiler, created on first use"""
+    return current_app.config.setdefault('profiler', SamplingProfiler())
+
+@admin_bp.route('/api/profiler', methods=['GET'])
+def api_profiler_status():
+    """API endpoint to get the sampling profiler status"""
+    return jsonify({'success': True, **_profiler().status()})
+
+@admin_bp.route('/api/profiler/start', methods=['POST'])
+def api_profiler_start():
+    """API endpoint to start a time-boxed profile of all threads"""
+    try:
+        data = request.get_json(silent=True) or {}
+        profiler = _profiler()
+        if not profiler.start(duration=float(data.get('duration', 30)), interval=data.get('interval')):
+            return jsonify({'success': False, 'message': 'A profile is already running'}), 409
+        return jsonify({'success': True, **profiler.status()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@admin_bp.route('/api/profiler/stop', methods=['POST'])
+def api_profiler_stop():
+    """API endpoint to stop the running profile early"""
+    profiler = _profiler()
+    profiler.stop()
+    return jsonify({'success': True, **profiler.status()})
+
+@admin_bp.route('/api/profiler/profile.folded')
+def api_profiler_download():
+    """Download the last profile as collapsed stacks (flamegraph.pl / speedscope input)"""
+    filename = f"profile-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.folded"
+    return Response(_profiler().collapsed(), mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
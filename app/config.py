@@ -3,14 +3,39 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def parse_cameras(value, default_source):
+    """
+    Parse "entrance=rtsp://...,lobby=1" into [(camera_id, source)].
+    Numeric sources are webcam indexes; an empty value means one "main" camera.
+    """
+    cameras = []
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        camera_id, _, source = entry.partition('=')
+        source = source.strip()
+        cameras.append((camera_id.strip(), int(source) if source.isdigit() else source))
+    return cameras or [("main", default_source)]
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'supersecretkey')
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png'}
     RTSP_URL = os.getenv('RTSP_URL', 'http://192.168.1.20:4747/video')
+    CAMERAS = parse_cameras(os.getenv('CAMERAS', ''), RTSP_URL)  # [(camera_id, source)]
     USE_POSTGRES = os.getenv("USE_POSTGRES", "False").lower() == "true"
     DB_PATH = os.getenv("DB_PATH", "employees.db")
     BATCH_DIRECTORY = os.getenv("BATCH_DIRECTORY", "employee_images")
+    EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))  # 0 = encode on the detection thread
+    # Run face detection every N frames, predicting tracker motion in between. Detection still runs early
+    # when a predicted box leaves the frame or changes size implausibly, and new faces only appear on
+    # detection frames, so they can be up to N-1 frames late
+    DETECTION_INTERVAL = int(os.getenv("DETECTION_INTERVAL", "1"))
+    MOTION_GATING = os.getenv("MOTION_GATING", "True").lower() == "true"  # Skip detection on motionless frames
+    REPLAY_REALTIME = os.getenv("REPLAY_REALTIME", "True").lower() == "true"  # Pace file sources at their frame rate
+    REPLAY_LOOP = os.getenv("REPLAY_LOOP", "True").lower() == "true"  # Restart file sources at the end
+    GALLERY_SNAPSHOT_DIR = os.getenv("GALLERY_SNAPSHOT_DIR", "gallery_snapshot")  # Empty = always load from the DB
     
     # Database configuration
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL') or \
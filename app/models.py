@@ -1,5 +1,7 @@
 from datetime import datetime, timezone
-from app import db
+from sqlalchemy import bindparam, inspect, or_, text
+from app import db, logger
+from app.services.face_encoding import ENCODING_FORMAT_FLOAT32LE, encode_encoding, load_legacy_encoding
 
 # Helper function for timestamp default value
 def get_utc_now():
@@ -11,6 +13,7 @@ class Employee(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     face_encoding = db.Column(db.LargeBinary, nullable=False)
+    encoding_format = db.Column(db.SmallInteger, nullable=True)  # See app.services.face_encoding; NULL = legacy pickle
     position = db.Column(db.String(255), default='')
     email = db.Column(db.String(255), default='')
     phone = db.Column(db.String(50), default='')
@@ -30,12 +33,39 @@ class Attendance(db.Model):
     status = db.Column(db.String(20), default='check-in')  # 'check-in', 'check-out', 'absent'
     work_hours = db.Column(db.Float, nullable=True)  # Hours worked (calculated on check-out)
     date = db.Column(db.Date, nullable=False, default=lambda: get_utc_now().date())
+    camera_id = db.Column(db.String(64), nullable=True)  # Camera that recorded the check-in
+    check_out_camera_id = db.Column(db.String(64), nullable=True)  # Camera that recorded the check-out
 
     # For backward compatibility
     @property
     def timestamp(self):
         return self.check_in_time
 
+    def calculate_work_hours(self):
+        """Calculate work hours if check-out time is available"""
+        if self.check_out_time and self.check_in_time:
+            # SQLite hands back naive datetimes; all stored times are UTC
+            check_in_time = self.check_in_time
+            check_out_time = self.check_out_time
+            if check_in_time.tzinfo is None:
+                check_in_time = check_in_time.replace(tzinfo=timezone.utc)
+            if check_out_time.tzinfo is None:
+                check_out_time = check_out_time.replace(tzinfo=timezone.utc)
+
+            delta = check_out_time - check_in_time
+            # Convert to hours (as decimal)
+            return round(delta.total_seconds() / 3600, 2)
+        return None
+
+    def update_work_hours(self):
+        """Update work hours based on check-in and check-out times"""
+        self.work_hours = self.calculate_work_hours()
+
+    def __repr__(self):
+        if self.check_out_time:
+            return f'<Attendance {self.employee_id} from {self.check_in_time} to {self.check_out_time}>'
+        return f'<Attendance {self.employee_id} checked in at {self.check_in_time}>'
+
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     message = db.Column(db.String(255), nullable=False)
@@ -89,19 +119,59 @@ class Notification(db.Model):
         else:
             return created_at.strftime("%b %d, %Y")
 
-    def calculate_work_hours(self):
-        """Calculate work hours if check-out time is available"""
-        if self.check_out_time and self.check_in_time:
-            delta = self.check_out_time - self.check_in_time
-            # Convert to hours (as decimal)
-            return round(delta.total_seconds() / 3600, 2)
-        return None
 
-    def update_work_hours(self):
-        """Update work hours based on check-in and check-out times"""
-        self.work_hours = self.calculate_work_hours()
+# Columns added after the first release: (table, column, DDL type).
+# create_all() never alters existing tables, so upgrade_schema() adds them.
+ADDED_COLUMNS = [
+    ('attendance', 'camera_id', 'VARCHAR(64)'),
+    ('attendance', 'check_out_camera_id', 'VARCHAR(64)'),
+    ('employee', 'encoding_format', 'SMALLINT'),
+]
 
-    def __repr__(self):
-        if self.check_out_time:
-            return f'<Attendance {self.employee_id} from {self.check_in_time} to {self.check_out_time}>'
-        return f'<Attendance {self.employee_id} checked in at {self.check_in_time}>'
\ No newline at end of file
+def upgrade_schema():
+    """Add missing nullable columns to existing tables (call inside an app context)"""
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+
+    with db.engine.begin() as connection:
+        for table, column, column_type in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            existing = {col['name'] for col in inspector.get_columns(table)}
+            if column not in existing:
+                connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+
+def migrate_face_encodings(batch_size=1000):
+    """
+    Rewrite pickled face encodings in the float32 format (call inside an app context).
+    Pickles are read with a numpy-only unpickler; rows that cannot be decoded are left
+    as they are and skipped by the loaders. updated_at is kept, so the rewrite does not
+    look like a photo change. Returns the number of rows converted.
+    """
+    table = Employee.__table__
+    rows = db.session.query(Employee.id, Employee.name, Employee.face_encoding, Employee.updated_at).filter(
+        or_(Employee.encoding_format.is_(None), Employee.encoding_format != ENCODING_FORMAT_FLOAT32LE)).all()
+    if not rows:
+        return 0
+
+    statement = table.update().where(table.c.id == bindparam('row_id')).values(
+        face_encoding=bindparam('blob'),
+        encoding_format=ENCODING_FORMAT_FLOAT32LE,
+        updated_at=bindparam('row_updated_at')
+    )
+
+    updates = []
+    for row in rows:
+        try:
+            blob = encode_encoding(load_legacy_encoding(row.face_encoding))
+        except Exception as e:
+            logger.warning(f"Cannot convert face encoding of employee {row.name} (ID: {row.id}): {e}")
+            continue
+        updates.append({'row_id': row.id, 'blob': blob, 'row_updated_at': row.updated_at})
+
+    for start in range(0, len(updates), batch_size):
+        db.session.execute(statement, updates[start:start + batch_size])
+    db.session.commit()
+
+    logger.info(f"Converted {len(updates)} of {len(rows)} pickled face encodings to float32")
+    return len(updates)
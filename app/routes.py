@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, current_app
 from app.services.db_service import DatabaseService
+from app.services.metrics import registry
 import os
 from werkzeug.utils import secure_filename
 
@@ -11,17 +12,29 @@ def allowed_file(filename):
 
 @main_bp.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', camera_ids=list(current_app.config.get('stream_hubs', {})))
 
 @main_bp.route('/video_feed')
-def video_feed():
-    video_service = current_app.config.get('video_service')
-    face_service = current_app.config.get('face_service')
-    if not video_service or not face_service:
+@main_bp.route('/video_feed/<camera_id>')
+def video_feed(camera_id=None):
+    # Frames are rendered and encoded once per camera by its hub and shared by all viewers
+    stream_hubs = current_app.config.get('stream_hubs')
+    if not stream_hubs:
         return "Services not initialized", 500
-    return Response(video_service.generate_frames(face_service),
+
+    if camera_id is None:
+        camera_id = next(iter(stream_hubs))
+    stream_hub = stream_hubs.get(camera_id)
+    if not stream_hub:
+        return f"Unknown camera {camera_id}", 404
+    return Response(stream_hub.stream(),
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@main_bp.route('/metrics')
+def metrics():
+    # Prometheus text exposition of pipeline histograms, counters and service stats
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @main_bp.route('/upload', methods=['GET', 'POST'])
 def upload_employee():
     if request.method == 'POST':
@@ -0,0 +1,155 @@
+import time
+from collections import deque
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+from app import db, logger
+from app.services.metrics import registry
+
+
+class AttendanceWriter:
+    """
+    Dedicated writer thread for attendance events.
+
+    The recognition thread only pushes (employee_id, tag, camera_id) events onto a bounded
+    queue. The writer groups queued events into one transaction per batch and
+    hands each log_attendance result back through poll_results(), tagged so the
+    caller can update the matching tracker label. When the queue is full new
+    events are rejected and counted instead of blocking recognition.
+    """
+
+    def __init__(self, app, db_service, max_queue_size=256, batch_size=32, batch_timeout=0.05):
+        self.app = app
+        self.db_service = db_service
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout  # Seconds to wait for more events before writing a batch
+
+        self.queue = Queue(maxsize=max_queue_size)
+        self.results = deque()
+        self.thread = None
+        self.running = False
+
+        # Backpressure and throughput metrics
+        self.metrics_lock = Lock()
+        self.submitted_events = 0
+        self.dropped_events = 0
+        self.written_events = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.max_queue_depth = 0
+        self.last_commit_time = 0
+        self.total_commit_time = 0
+        self.commit_seconds = registry.histogram('attendance_commit_seconds',
+                                                 "Time to log and commit one attendance batch").labels()
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self.thread = Thread(target=self._writer_loop, name="attendance-writer", daemon=True)
+        self.thread.start()
+        logger.info("Attendance writer started")
+
+    def stop(self, timeout=5):
+        """Flush every queued event, then stop the writer thread"""
+        if not self.running:
+            return
+
+        self.running = False
+        try:
+            self.queue.put(None, timeout=timeout)  # Sentinel: written after all earlier events
+        except Full:
+            logger.warning("Attendance writer queue still full on stop; pending events may be lost")
+        self.thread.join(timeout=timeout)
+        logger.info(f"Attendance writer stopped ({self.written_events} events written, "
+                    f"{self.dropped_events} dropped)")
+
+    def submit(self, employee_id, tag=None, camera_id=None):
+        """
+        Queue an attendance event without blocking.
+        Returns False if the queue is full and the event was dropped.
+        """
+        try:
+            self.queue.put_nowait((employee_id, tag, camera_id))
+        except Full:
+            with self.metrics_lock:
+                self.dropped_events += 1
+            return False
+
+        with self.metrics_lock:
+            self.submitted_events += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return True
+
+    def poll_results(self):
+        """Drain finished events as (tag, employee_id, result) tuples"""
+        results = []
+        while self.results:
+            results.append(self.results.popleft())
+        return results
+
+    def stats(self):
+        with self.metrics_lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'submitted_events': self.submitted_events,
+                'dropped_events': self.dropped_events,
+                'written_events': self.written_events,
+                'batches': self.batches,
+                'failed_batches': self.failed_batches,
+                'last_commit_ms': self.last_commit_time * 1000,
+                'avg_commit_ms': self.total_commit_time * 1000 / self.batches if self.batches else 0
+            }
+
+    def _writer_loop(self):
+        stopping = False
+        while not stopping:
+            event = self.queue.get()
+            if event is None:
+                break
+
+            # Collect more events for the same transaction
+            batch = [event]
+            deadline = time.time() + self.batch_timeout
+            while len(batch) < self.batch_size:
+                try:
+                    event = self.queue.get(timeout=max(0, deadline - time.time()))
+                except Empty:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        """Log every event of the batch and commit them as one transaction"""
+        start_time = time.time()
+
+        with self.app.app_context():
+            try:
+                results = [self.db_service.log_attendance(employee_id, commit=False, camera_id=camera_id)
+                           for employee_id, _, camera_id in batch]
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Attendance batch of {len(batch)} failed, retrying events one by one: {e}")
+                with self.metrics_lock:
+                    self.failed_batches += 1
+
+                # Isolate the failing event so the rest of the batch is still recorded
+                results = [self.db_service.log_attendance(employee_id, camera_id=camera_id)
+                           for employee_id, _, camera_id in batch]
+
+        commit_time = time.time() - start_time
+        self.commit_seconds.observe(commit_time)
+        with self.metrics_lock:
+            self.batches += 1
+            self.written_events += len(batch)
+            self.last_commit_time = commit_time
+            self.total_commit_time += commit_time
+
+        for (employee_id, tag, _), result in zip(batch, results):
+            self.results.append((tag, employee_id, result))
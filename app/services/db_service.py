@@ -1,9 +1,101 @@
-import pickle
 import cv2
 import numpy as np
 from datetime import datetime, timedelta, timezone
+from threading import Lock
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from app import db, logger
 from app.models import Employee, Attendance
+from app.services.face_encoding import (ENCODING_BYTES, ENCODING_DIMENSIONS, ENCODING_FORMAT_FLOAT32LE,
+                                        decode_encoding, decode_encodings, encode_encoding)
+
+class AttendanceStateCache:
+    """
+    In-memory copy of each employee's current-day attendance state, so repeated
+    recognitions (which mostly end in a skip) don't query the database.
+
+    Entries are dropped whenever a change to an Employee or Attendance row is
+    committed anywhere in the process (see the listeners below), including admin
+    edits, and are ignored once their date is no longer today.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.entries = {}      # employee_id -> state dict
+        self.generations = {}  # employee_id -> invalidation counter
+
+    def get(self, employee_id, current_date):
+        """Return (state or None, generation); a state from another day counts as a miss"""
+        with self.lock:
+            state = self.entries.get(employee_id)
+            if state is not None and state['date'] != current_date:
+                del self.entries[employee_id]
+                state = None
+            return state, self.generations.get(employee_id, 0)
+
+    def store(self, employee_id, state, generation=None):
+        """
+        Save a state. When generation is given (state read from the database), the
+        state is only kept if no invalidation happened since that read.
+        """
+        with self.lock:
+            if generation is not None and generation != self.generations.get(employee_id, 0):
+                return
+            self.entries[employee_id] = state
+
+    def invalidate(self, employee_id=None):
+        with self.lock:
+            if employee_id is None:
+                self.entries.clear()
+                for key in self.generations:
+                    self.generations[key] += 1
+                return
+            self.entries.pop(employee_id, None)
+            self.generations[employee_id] = self.generations.get(employee_id, 0) + 1
+
+    def __len__(self):
+        return len(self.entries)
+
+# Shared by every DatabaseService instance in the process
+attendance_state_cache = AttendanceStateCache()
+
+def _queue_invalidation(target, employee_id):
+    # Flushed changes are invisible to other sessions until commit, so invalidate then;
+    # otherwise a concurrent read could cache the old state under the new generation
+    session = object_session(target)
+    if session is None:
+        attendance_state_cache.invalidate(employee_id)
+        return
+    session.info.setdefault('attendance_invalidations', set()).add(employee_id)
+
+@event.listens_for(Attendance, 'after_insert')
+@event.listens_for(Attendance, 'after_update')
+@event.listens_for(Attendance, 'after_delete')
+def _invalidate_attendance_state(mapper, connection, target):
+    _queue_invalidation(target, target.employee_id)
+
+@event.listens_for(Employee, 'after_update')
+@event.listens_for(Employee, 'after_delete')
+def _invalidate_employee_state(mapper, connection, target):
+    _queue_invalidation(target, target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    for employee_id in session.info.pop('attendance_invalidations', ()):
+        attendance_state_cache.invalidate(employee_id)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _apply_rolled_back_invalidations(session, previous_transaction):
+    # Nothing was committed, but the session itself may have read (and cached) its own
+    # uncommitted rows, so the touched employees are still dropped from the cache
+    for employee_id in session.info.pop('attendance_invalidations', ()):
+        attendance_state_cache.invalidate(employee_id)
+
+def _as_utc(value):
+    """Attach UTC to naive datetimes read back from SQLite"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
 class DatabaseService:
     # Default work hour settings
@@ -37,42 +129,99 @@ class DatabaseService:
         """
         Load employee face encodings with enhanced error handling for office environment
         """
-        try:
-            # Don't create a new app context, use the existing one
-            employees = Employee.query.all()
-            employee_profiles = []
+        return self.load_gallery_arrays()[0]
 
-            for emp in employees:
-                try:
-                    encoding = pickle.loads(emp.face_encoding)
+    def load_gallery_arrays(self, raise_errors=False):
+        """
+        Bulk-load every employee for the recognition gallery with one query.
 
-                    # Validate encoding format
-                    if not isinstance(encoding, np.ndarray):
-                        logger.warning(f"Invalid encoding format for employee {emp.name} (ID: {emp.id})")
+        Float32 encodings are decoded together with a single np.frombuffer call
+        instead of one unpickle per row. Returns (profiles, ids, encodings):
+        profile dicts, an int64 id array and a read-only (N, 128) float32 matrix
+        whose rows are the profiles' encodings. Ready for FaceGallery.from_arrays.
+        Database errors give an empty gallery unless raise_errors is set.
+        """
+        try:
+            # Plain row tuples: no ORM objects are built for the whole table
+            rows = db.session.execute(db.select(
+                Employee.id, Employee.name, Employee.position, Employee.email, Employee.phone,
+                Employee.updated_at, Employee.face_encoding, Employee.encoding_format
+            )).all()
+
+            profiles = []
+            blobs = []
+            for employee_id, name, position, email, phone, updated_at, blob, encoding_format in rows:
+                if encoding_format != ENCODING_FORMAT_FLOAT32LE or len(blob) != ENCODING_BYTES:
+                    # Not migrated yet (or damaged): decode on its own and validate
+                    try:
+                        blob = encode_encoding(decode_encoding(blob, encoding_format))
+                    except Exception as e:
+                        logger.warning(f"Invalid encoding for employee {name} (ID: {employee_id}): {e}")
                         continue
 
-                    # Check encoding dimensions
-                    if encoding.shape[0] != 128:  # Face encodings should be 128-dimensional
-                        logger.warning(f"Invalid encoding dimensions for employee {emp.name} (ID: {emp.id})")
-                        continue
+                blobs.append(blob)
+                profiles.append({"id": employee_id, "name": name, "position": position, "email": email,
+                                 "phone": phone, "updated_at": updated_at})
+
+            encodings = decode_encodings(blobs)
+            ids = np.fromiter((profile["id"] for profile in profiles), dtype=np.int64, count=len(profiles))
+            for profile, encoding in zip(profiles, encodings):
+                profile["encoding"] = encoding
 
-                    employee_profiles.append({
-                        "id": emp.id,
-                        "name": emp.name,
-                        "position": emp.position,
-                        "encoding": encoding,
-                        "email": emp.email,
-                        "phone": emp.phone
-                    })
-                except Exception as e:
-                    logger.error(f"Failed to load encoding for employee {emp.name} (ID: {emp.id}): {e}")
-                    continue
-
-            logger.info(f"Loaded {len(employee_profiles)} employee profiles.")
-            return employee_profiles
+            logger.info(f"Loaded {len(profiles)} employee profiles.")
+            return profiles, ids, encodings
         except Exception as e:
             logger.error(f"Failed to load employee encodings: {e}")
-            return []
+            if raise_errors:
+                raise
+            return [], np.empty(0, dtype=np.int64), decode_encodings([])
+
+    def gallery_version(self):
+        """
+        Cheap fingerprint of the employee table for GallerySnapshot: any insert,
+        delete or update (updated_at is bumped on every change) alters it.
+        """
+        count, max_id, id_sum, last_update = db.session.execute(db.select(
+            db.func.count(Employee.id), db.func.max(Employee.id), db.func.sum(Employee.id),
+            db.func.max(Employee.updated_at)
+        )).one()
+        return f"{count}:{max_id}:{id_sum}:{last_update}"
+
+    def load_employee_profiles(self, employee_ids):
+        """
+        Load the profiles of specific employees (used for incremental gallery updates).
+        Returns {employee_id: profile}; ids that no longer exist or have no valid
+        encoding are missing from the result.
+        """
+        profiles = {}
+        for emp in Employee.query.filter(Employee.id.in_(list(employee_ids))).all():
+            profile = self._employee_profile(emp)
+            if profile is not None:
+                profiles[emp.id] = profile
+        return profiles
+
+    def _employee_profile(self, emp):
+        """Decode and validate an employee's face encoding; returns the profile dict or None"""
+        try:
+            encoding = decode_encoding(emp.face_encoding, emp.encoding_format)
+
+            # Check encoding dimensions
+            if encoding.shape[0] != ENCODING_DIMENSIONS:  # Face encodings should be 128-dimensional
+                logger.warning(f"Invalid encoding dimensions for employee {emp.name} (ID: {emp.id})")
+                return None
+
+            return {
+                "id": emp.id,
+                "name": emp.name,
+                "position": emp.position,
+                "encoding": encoding,
+                "email": emp.email,
+                "phone": emp.phone,
+                "updated_at": emp.updated_at
+            }
+        except Exception as e:
+            logger.error(f"Failed to load encoding for employee {emp.name} (ID: {emp.id}): {e}")
+            return None
 
     def add_employee(self, name, image_path, position='', email='', phone=''):
         """
@@ -105,12 +254,13 @@ class DatabaseService:
                 return False
 
             encoding = encodings[0]
-            encoding_blob = pickle.dumps(encoding)
+            encoding_blob = encode_encoding(encoding)
 
             # Create and save employee record
             employee = Employee(
                 name=name,
                 face_encoding=encoding_blob,
+                encoding_format=ENCODING_FORMAT_FLOAT32LE,
                 position=position,
                 email=email,
                 phone=phone
@@ -158,7 +308,7 @@ class DatabaseService:
                 return False
 
             encoding = encodings[0]
-            encoding_blob = pickle.dumps(encoding)
+            encoding_blob = encode_encoding(encoding)
 
             # Update employee record
             employee = Employee.query.get(employee_id)
@@ -167,6 +317,7 @@ class DatabaseService:
                 return False
 
             employee.face_encoding = encoding_blob
+            employee.encoding_format = ENCODING_FORMAT_FLOAT32LE
             employee.updated_at = datetime.now(timezone.utc)
             db.session.commit()
 
@@ -242,78 +393,90 @@ class DatabaseService:
 
         return largest_face
 
-    def log_attendance(self, employee_id):
+    def log_attendance(self, employee_id, commit=True, camera_id=None):
         """
-        Log employee attendance with check-in/check-out functionality
+        Log employee attendance with check-in/check-out functionality.
+        camera_id records which camera saw the employee.
+
+        With commit=False the changes stay in the session for the caller to commit
+        (so several events can share one transaction) and errors are raised
+        instead of rolling the session back.
         """
         try:
-            # Get employee details
-            employee = Employee.query.get(employee_id)
-            if not employee:
-                logger.error(f"Cannot log attendance: Employee with ID {employee_id} not found.")
-                return False
-
             # Get current time (timezone-aware)
             current_time = datetime.now(timezone.utc)
             current_date = current_time.date()
 
-            # Find today's attendance record for this employee
-            today_record = Attendance.query.filter_by(
-                employee_id=employee_id,
-                date=current_date
-            ).first()
+            # Today's state comes from the cache; the database is only read on a miss
+            state = self._get_attendance_state(employee_id, current_date)
+            if state is None:
+                logger.error(f"Cannot log attendance: Employee with ID {employee_id} not found.")
+                return False
+            employee_name = state['name']
 
             # Work hour settings are now instance variables
             # self.work_start_hour, self.work_end_hour, self.min_hours, self.cooldown_minutes
 
             # Check if we need to create a new record or update existing one
-            if not today_record:
+            if state['record_id'] is None:
                 # No record for today - create a new check-in
                 attendance = Attendance(
                     employee_id=employee_id,
                     check_in_time=current_time,
                     status='check-in',
-                    date=current_date
+                    date=current_date,
+                    camera_id=camera_id
                 )
                 db.session.add(attendance)
-                db.session.commit()
-                logger.info(f"Logged check-in for {employee.name} (ID: {employee_id}) at {current_time}.")
+                if commit:
+                    db.session.commit()
+                self._update_attendance_state(employee_id, state, commit, attendance)
+                logger.info(f"Logged check-in for {employee_name} (ID: {employee_id}) at {current_time}.")
                 return {'action': 'check-in', 'time': current_time}
 
             # We have a record for today
             # Determine if this should be a check-out or if it's too soon after check-in
-            if today_record.status == 'check-in' and not today_record.check_out_time:
+            if state['status'] == 'check-in' and not state['check_out_time']:
                 # Calculate time since check-in
-                time_since_checkin = current_time - today_record.check_in_time
+                time_since_checkin = current_time - state['check_in_time']
 
                 # Check if enough time has passed for a valid check-out
                 if time_since_checkin.total_seconds() < (self.min_hours * 3600):
                     # Too soon for check-out, treat as duplicate check-in
                     if time_since_checkin.total_seconds() < (self.cooldown_minutes * 60):
-                        logger.info(f"Skipping duplicate check-in for {employee.name}: recent entry exists.")
+                        logger.info(f"Skipping duplicate check-in for {employee_name}: recent entry exists.")
                         return {'action': 'skip', 'reason': 'recent-checkin'}
 
                     # It's been more than cooldown but less than minimum hours - update check-in time
+                    today_record = Attendance.query.get(state['record_id'])
                     today_record.check_in_time = current_time
-                    db.session.commit()
-                    logger.info(f"Updated check-in time for {employee.name} to {current_time}.")
+                    today_record.camera_id = camera_id
+                    if commit:
+                        db.session.commit()
+                    self._update_attendance_state(employee_id, state, commit, today_record)
+                    logger.info(f"Updated check-in time for {employee_name} to {current_time}.")
                     return {'action': 'update-checkin', 'time': current_time}
 
                 # Enough time has passed, record check-out
+                today_record = Attendance.query.get(state['record_id'])
                 today_record.check_out_time = current_time
+                today_record.check_out_camera_id = camera_id
                 today_record.status = 'check-out'
                 today_record.update_work_hours()
-                db.session.commit()
-                logger.info(f"Logged check-out for {employee.name} (ID: {employee_id}) at {current_time}.")
-                return {'action': 'check-out', 'time': current_time, 'hours': today_record.work_hours}
+                work_hours = today_record.work_hours
+                if commit:
+                    db.session.commit()
+                self._update_attendance_state(employee_id, state, commit, today_record)
+                logger.info(f"Logged check-out for {employee_name} (ID: {employee_id}) at {current_time}.")
+                return {'action': 'check-out', 'time': current_time, 'hours': work_hours}
 
             # Already checked out today
-            if today_record.status == 'check-out' and today_record.check_out_time:
+            if state['status'] == 'check-out' and state['check_out_time']:
                 # Check if enough time has passed since check-out
-                time_since_checkout = current_time - today_record.check_out_time
+                time_since_checkout = current_time - state['check_out_time']
 
                 if time_since_checkout.total_seconds() < (self.cooldown_minutes * 60):
-                    logger.info(f"Skipping attendance log for {employee.name}: already checked out today.")
+                    logger.info(f"Skipping attendance log for {employee_name}: already checked out today.")
                     return {'action': 'skip', 'reason': 'already-checkout'}
 
                 # It's been long enough - create a new check-in record
@@ -322,20 +485,67 @@ class DatabaseService:
                     employee_id=employee_id,
                     check_in_time=current_time,
                     status='check-in',
-                    date=current_date
+                    date=current_date,
+                    camera_id=camera_id
                 )
                 db.session.add(attendance)
-                db.session.commit()
-                logger.info(f"Logged additional check-in for {employee.name} (ID: {employee_id}) at {current_time}.")
+                if commit:
+                    db.session.commit()
+                self._update_attendance_state(employee_id, state, commit, attendance)
+                logger.info(f"Logged additional check-in for {employee_name} (ID: {employee_id}) at {current_time}.")
                 return {'action': 'additional-checkin', 'time': current_time}
 
             # Fallback - should not reach here in normal operation
-            logger.warning(f"Unexpected attendance state for {employee.name} (ID: {employee_id}).")
+            logger.warning(f"Unexpected attendance state for {employee_name} (ID: {employee_id}).")
             return {'action': 'error', 'reason': 'unexpected-state'}
 
         except Exception as e:
+            if not commit:
+                raise
             db.session.rollback()
             logger.error(f"Failed to log attendance: {e}")
             import traceback
             logger.error(traceback.format_exc())
             return {'action': 'error', 'reason': str(e)}
+
+    def _get_attendance_state(self, employee_id, current_date):
+        """
+        Current-day attendance state of an employee, from the cache or the database.
+        Returns None if the employee does not exist.
+        """
+        state, generation = attendance_state_cache.get(employee_id, current_date)
+        if state is not None:
+            return state
+
+        # Get employee details
+        employee = Employee.query.get(employee_id)
+        if not employee:
+            return None
+
+        # Latest attendance record for today (there can be several after a re-check-in)
+        today_record = Attendance.query.filter_by(
+            employee_id=employee_id,
+            date=current_date
+        ).order_by(Attendance.id.desc()).first()
+
+        state = {'date': current_date, 'name': employee.name}
+        self._copy_record_state(state, today_record)
+        attendance_state_cache.store(employee_id, state, generation)
+        return state
+
+    def _update_attendance_state(self, employee_id, state, committed, record):
+        """Refresh the cached state after a write (uncommitted writes are re-read next time)"""
+        if not committed:
+            attendance_state_cache.invalidate(employee_id)
+            return
+
+        state = dict(state)
+        self._copy_record_state(state, record)
+        attendance_state_cache.store(employee_id, state)
+
+    @staticmethod
+    def _copy_record_state(state, record):
+        state['record_id'] = record.id if record else None
+        state['check_in_time'] = _as_utc(record.check_in_time) if record else None
+        state['check_out_time'] = _as_utc(record.check_out_time) if record else None
+        state['status'] = record.status if record else None
@@ -0,0 +1,281 @@
+import itertools
+import multiprocessing
+import queue
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from app import logger
+
+
+def _embedding_worker(task_queue, result_queue, slot_names, num_jitters, model):
+    """
+    Worker process: encode faces from frames placed in shared memory slots.
+    Runs until it receives None on the task queue.
+    """
+    import face_recognition
+
+    # Workers share the parent's resource tracker, so attaching here does not
+    # transfer ownership; only the pool unlinks the blocks on stop()
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            job_id, slot, frame_shape, face_locations = task
+            frame = np.ndarray(frame_shape, dtype=np.uint8, buffer=slots[slot].buf)
+
+            encodings = []
+            error = None
+            try:
+                encodings = face_recognition.face_encodings(
+                    frame,
+                    face_locations,
+                    num_jitters=num_jitters,
+                    model=model
+                )
+            except Exception as e:
+                error = str(e)
+
+            del frame
+            result_queue.put((job_id, [np.asarray(e) for e in encodings], error))
+    finally:
+        for shm in slots:
+            shm.close()
+
+
+class EmbeddingWorkerPool:
+    """
+    Pool of face embedding worker processes fed through shared memory.
+
+    Each submitted frame is copied once into a free shared memory slot and only
+    the slot index and face locations travel through the task queue, so frames
+    are never pickled. Encodings are collected asynchronously with poll().
+    Submissions are rejected while every slot is busy, which bounds memory use
+    and keeps the caller from falling behind.
+
+    Every worker has its own task and result queue, so the pool knows which jobs
+    a worker holds and a killed worker can't leave a shared queue lock taken.
+    poll() restarts workers that died (crash, OOM kill) and gives the slots of
+    their jobs back; jobs unanswered after job_timeout seconds are reclaimed too.
+    """
+
+    def __init__(self, num_workers=2, num_slots=None, num_jitters=1, model="small", job_timeout=30):
+        self.num_workers = num_workers
+        self.num_slots = num_slots or num_workers * 2
+        self.num_jitters = num_jitters
+        self.model = model
+        self.job_timeout = job_timeout  # Seconds before an unanswered job's slot is reclaimed
+
+        self.slot_size = 0
+        self.slots = []
+        self.free_slots = []
+        self.context = None
+        self.running = False
+
+        # Per worker: process, its task and result queues, and the ids of the jobs queued to it
+        self.processes = []
+        self.task_queues = []
+        self.result_queues = []
+        self.worker_jobs = []
+
+        # Jobs in flight: job_id -> (caller tags (one per face location), slot, worker, submit time)
+        self.pending_jobs = {}
+        self._job_ids = itertools.count()
+
+        # Metrics
+        self.submitted_jobs = 0
+        self.rejected_jobs = 0
+        self.oversized_jobs = 0  # Rejected because the frame is larger than a slot
+        self.failed_jobs = 0
+        self.lost_jobs = 0  # Reclaimed from dead workers or after job_timeout
+        self.restarted_workers = 0
+
+    def start(self, max_frame_bytes):
+        """Allocate the shared memory slots and spawn the worker processes"""
+        if self.running:
+            return
+
+        self.slot_size = max_frame_bytes
+        self.slots = [shared_memory.SharedMemory(create=True, size=max_frame_bytes)
+                      for _ in range(self.num_slots)]
+        self.free_slots = list(range(self.num_slots))
+
+        # Spawn (not fork) so workers don't inherit the parent's threads and locks
+        self.context = multiprocessing.get_context('spawn')
+        self.processes = [None] * self.num_workers
+        self.task_queues = [None] * self.num_workers
+        self.result_queues = [None] * self.num_workers
+        self.worker_jobs = [set() for _ in range(self.num_workers)]
+        for index in range(self.num_workers):
+            self._spawn_worker(index)
+
+        self.running = True
+        logger.info(f"Embedding worker pool started with {self.num_workers} processes")
+
+    def _spawn_worker(self, index):
+        """Start worker index with fresh queues"""
+        self.task_queues[index] = self.context.Queue()
+        self.result_queues[index] = self.context.Queue()
+        process = self.context.Process(
+            target=_embedding_worker,
+            args=(self.task_queues[index], self.result_queues[index], [shm.name for shm in self.slots],
+                  self.num_jitters, self.model),
+            name=f"embedding-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+
+    def resize(self, max_frame_bytes):
+        """
+        Recreate the slots for frames of up to max_frame_bytes, restarting the
+        workers attached to them. Jobs in flight are dropped; counters are kept.
+        """
+        dropped = len(self.pending_jobs)
+        self.stop()
+        self.start(max_frame_bytes)
+        self.lost_jobs += dropped
+
+    def stop(self):
+        if not self.running:
+            return
+
+        self.running = False
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.task_queues = []
+        self.result_queues = []
+        self.worker_jobs = []
+
+        for shm in self.slots:
+            shm.close()
+            shm.unlink()
+        self.slots = []
+        self.free_slots = []
+        self.pending_jobs = {}
+        logger.info("Embedding worker pool stopped")
+
+    def submit(self, rgb_frame, face_locations, tags):
+        """
+        Queue face locations of a frame for encoding on the least busy worker.
+        tags holds one caller value per location and is returned with the results.
+        Returns the job id, or None if no slot is free or the frame does not fit.
+        """
+        if rgb_frame.nbytes > self.slot_size:
+            if not self.oversized_jobs:
+                logger.warning(f"Rejecting {rgb_frame.shape} frame: {rgb_frame.nbytes} bytes exceed the "
+                               f"{self.slot_size}-byte embedding slots")
+            self.oversized_jobs += 1
+            self.rejected_jobs += 1
+            return None
+
+        if not self.running or not self.free_slots:
+            self.rejected_jobs += 1
+            return None
+
+        slot = self.free_slots.pop()
+        view = np.ndarray(rgb_frame.shape, dtype=np.uint8, buffer=self.slots[slot].buf)
+        np.copyto(view, rgb_frame)
+        del view
+
+        job_id = next(self._job_ids)
+        worker = min(range(self.num_workers), key=lambda index: len(self.worker_jobs[index]))
+        self.pending_jobs[job_id] = (list(tags), slot, worker, time.monotonic())
+        self.worker_jobs[worker].add(job_id)
+        self.task_queues[worker].put((job_id, slot, rgb_frame.shape, list(face_locations)))
+        self.submitted_jobs += 1
+        return job_id
+
+    def poll(self):
+        """
+        Collect finished jobs without blocking.
+        Returns a list of (tags, encodings, seconds); encodings holds one entry per
+        tag, None where the face could not be encoded, and seconds is the job's
+        submit-to-result round trip. Jobs lost to a dead worker are not returned;
+        their callers resubmit once they stop waiting.
+        """
+        completed = []
+        for result_queue in self.result_queues:
+            while True:
+                try:
+                    job_id, encodings, error = result_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                # Reclaimed jobs already gave their slot back
+                job = self._release(job_id)
+                if job is None:
+                    continue
+                tags, _, _, submitted_at = job
+
+                if error:
+                    self.failed_jobs += 1
+                    logger.error(f"Embedding job {job_id} failed: {error}")
+
+                encodings = list(encodings) + [None] * (len(tags) - len(encodings))
+                completed.append((tags, encodings, time.monotonic() - submitted_at))
+
+        if self.running:
+            self._check_workers()
+        return completed
+
+    def _check_workers(self):
+        """Restart dead workers and reclaim the slots of jobs that will never be answered"""
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+
+            logger.error(f"Embedding worker {index} died (exit code {process.exitcode}); restarting it "
+                         f"and dropping its {len(self.worker_jobs[index])} queued job(s)")
+            for job_id in list(self.worker_jobs[index]):
+                self._reclaim(job_id)
+            for old_queue in (self.task_queues[index], self.result_queues[index]):
+                old_queue.cancel_join_thread()
+                old_queue.close()
+            self._spawn_worker(index)
+            self.restarted_workers += 1
+
+        deadline = time.monotonic() - self.job_timeout
+        for job_id, (_, _, _, submitted_at) in list(self.pending_jobs.items()):
+            if submitted_at < deadline:
+                logger.warning(f"Embedding job {job_id} unanswered after {self.job_timeout}s; reclaiming its slot")
+                self._reclaim(job_id)
+
+    def _release(self, job_id):
+        """Forget a job and free its slot; returns the job, or None if it was already released"""
+        job = self.pending_jobs.pop(job_id, None)
+        if job is not None:
+            _, slot, worker, _ = job
+            self.free_slots.append(slot)
+            self.worker_jobs[worker].discard(job_id)
+        return job
+
+    def _reclaim(self, job_id):
+        if self._release(job_id) is not None:
+            self.lost_jobs += 1
+
+    @property
+    def in_flight(self):
+        return len(self.pending_jobs)
+
+    def stats(self):
+        return {
+            'workers': self.num_workers,
+            'alive_workers': sum(process.is_alive() for process in self.processes),
+            'in_flight': self.in_flight,
+            'free_slots': len(self.free_slots),
+            'submitted_jobs': self.submitted_jobs,
+            'rejected_jobs': self.rejected_jobs,
+            'oversized_jobs': self.oversized_jobs,
+            'failed_jobs': self.failed_jobs,
+            'lost_jobs': self.lost_jobs,
+            'restarted_workers': self.restarted_workers
+        }
@@ -0,0 +1,64 @@
+import io
+import pickle
+import numpy as np
+
+ENCODING_DIMENSIONS = 128
+ENCODING_DTYPE = np.dtype('<f4')
+ENCODING_BYTES = ENCODING_DIMENSIONS * ENCODING_DTYPE.itemsize  # 512
+
+# Values of Employee.encoding_format
+ENCODING_FORMAT_PICKLE = 0  # Legacy pickle.dumps(np.ndarray); NULL in rows written before the column existed
+ENCODING_FORMAT_FLOAT32LE = 1  # 128 little-endian float32 values
+
+
+def encode_encoding(encoding):
+    """Serialize a 128-d face encoding as 512 bytes of little-endian float32"""
+    values = np.asarray(encoding, dtype=ENCODING_DTYPE).reshape(-1)
+    if values.shape[0] != ENCODING_DIMENSIONS:
+        raise ValueError(f"Expected {ENCODING_DIMENSIONS} values, got {values.shape[0]}")
+    return values.tobytes()
+
+
+def decode_encoding(blob, encoding_format):
+    """Decode one stored encoding into a float32 vector (read-only for the float32 format)"""
+    if encoding_format == ENCODING_FORMAT_FLOAT32LE:
+        if len(blob) != ENCODING_BYTES:
+            raise ValueError(f"Expected {ENCODING_BYTES} bytes, got {len(blob)}")
+        return np.frombuffer(blob, dtype=ENCODING_DTYPE)
+    return np.asarray(load_legacy_encoding(blob), dtype=np.float32)
+
+
+def decode_encodings(blobs):
+    """
+    Decode many float32 encodings at once into a read-only (N, 128) matrix:
+    the blobs are joined and viewed with a single np.frombuffer call.
+    """
+    if not blobs:
+        return np.empty((0, ENCODING_DIMENSIONS), dtype=ENCODING_DTYPE)
+    return np.frombuffer(b''.join(blobs), dtype=ENCODING_DTYPE).reshape(len(blobs), ENCODING_DIMENSIONS)
+
+
+class _NumpyUnpickler(pickle.Unpickler):
+    """Unpickler that only reconstructs numpy arrays, never arbitrary callables"""
+
+    ALLOWED = {
+        ('numpy.core.multiarray', '_reconstruct'),
+        ('numpy._core.multiarray', '_reconstruct'),
+        ('numpy.core.multiarray', 'scalar'),
+        ('numpy._core.multiarray', 'scalar'),
+        ('numpy', 'ndarray'),
+        ('numpy', 'dtype'),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self.ALLOWED:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from a face encoding")
+        return super().find_class(module, name)
+
+
+def load_legacy_encoding(blob):
+    """Read a pickled numpy encoding written before the float32 format, without trusting the pickle"""
+    encoding = _NumpyUnpickler(io.BytesIO(blob)).load()
+    if not isinstance(encoding, np.ndarray):
+        raise ValueError(f"Pickled encoding is a {type(encoding).__name__}, not an array")
+    return encoding
@@ -0,0 +1,275 @@
+import numpy as np
+from threading import RLock
+
+
+class FaceGallery:
+    """
+    Vectorized gallery of enrolled face encodings.
+
+    All encodings live in one contiguous float32 (N, 128) matrix together with
+    their precomputed squared norms, so matching one or many probes against the
+    whole gallery is a single matrix product instead of N face_distance calls.
+
+    Rows can be added, replaced and removed in place (upsert/remove) without
+    rebuilding the matrix, so live enrolment changes cost O(128) per employee.
+
+    An optional approximate index (see IVFIndex) can be attached for very large
+    galleries; searches fall back to the exact scan whenever the index is missing,
+    untrained or built for an older version of the gallery.
+    """
+
+    def __init__(self, profiles=None, dimensions=128):
+        self.dimensions = dimensions
+        self.lock = RLock()
+
+        # Gallery storage (row i of every array describes the same employee)
+        self.profiles = []
+        self.ids = np.empty(0, dtype=np.int64)
+        self.encodings = np.empty((0, dimensions), dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)  # Squared L2 norm of each row
+        self.version = 0  # Bumped on every content change
+        self.rows = {}  # Employee id -> row index
+
+        # Backing buffers with spare capacity; the public arrays are views of the used rows
+        self._encoding_buffer = self.encodings
+        self._norm_buffer = self.norms
+        self._id_buffer = self.ids
+
+        # Optional approximate nearest-neighbour index
+        self.index = None
+        self.index_version = -1
+
+        if profiles:
+            self.load(profiles)
+
+    @classmethod
+    def from_arrays(cls, profiles, ids, encodings):
+        """Gallery built straight from DatabaseService.load_gallery_arrays() output"""
+        gallery = cls(dimensions=encodings.shape[1])
+        gallery.load_arrays(profiles, ids, encodings)
+        return gallery
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def load(self, profiles):
+        """
+        Replace the gallery contents with the given employee profiles
+        (as returned by DatabaseService.load_employee_encodings)
+        """
+        profiles = list(profiles)
+        encodings = np.empty((len(profiles), self.dimensions), dtype=np.float32)
+        for i, profile in enumerate(profiles):
+            encodings[i] = profile["encoding"]
+
+        ids = np.array([profile["id"] for profile in profiles], dtype=np.int64)
+        self.load_arrays(profiles, ids, encodings)
+
+    def load_arrays(self, profiles, ids, encodings, copy=True):
+        """
+        Replace the gallery contents with profiles and their ids and (N, dimensions)
+        encoding matrix in the same row order. The matrix is copied once, so it may
+        be a read-only view (e.g. from np.frombuffer). With copy=False a read-only
+        float32 matrix such as a memory-mapped snapshot is searched in place and
+        only copied on the first upsert or remove.
+        """
+        profiles = list(profiles)
+        encodings = np.array(encodings, dtype=np.float32, order='C', copy=copy or None)
+        encodings = encodings.reshape(len(profiles), self.dimensions)
+        ids = np.array(ids, dtype=np.int64)
+        norms = np.einsum('ij,ij->i', encodings, encodings)
+
+        with self.lock:
+            self.profiles = profiles
+            self.rows = {employee_id: row for row, employee_id in enumerate(ids.tolist())}
+            self._encoding_buffer = encodings
+            self._norm_buffer = norms
+            self._id_buffer = ids
+            self._publish()
+
+    def get(self, employee_id):
+        """Profile of an enrolled employee, or None"""
+        with self.lock:
+            row = self.rows.get(employee_id)
+            return self.profiles[row] if row is not None else None
+
+    def upsert(self, profile):
+        """Add an employee, or replace the encoding and details of an enrolled one"""
+        encoding = np.asarray(profile["encoding"], dtype=np.float32).reshape(self.dimensions)
+
+        with self.lock:
+            self._make_writable()
+            row = self.rows.get(profile["id"])
+            if row is None:
+                row = len(self.profiles)
+                self._reserve(row + 1)
+                self.profiles.append(profile)
+                self.rows[profile["id"]] = row
+            else:
+                self.profiles[row] = profile
+
+            self._encoding_buffer[row] = encoding
+            self._norm_buffer[row] = np.dot(encoding, encoding)
+            self._id_buffer[row] = profile["id"]
+            self._publish()
+
+    def remove(self, employee_id):
+        """Remove an employee; the last row is moved into the freed slot. Returns True if found."""
+        with self.lock:
+            row = self.rows.pop(employee_id, None)
+            if row is None:
+                return False
+
+            self._make_writable()
+            last = len(self.profiles) - 1
+            if row != last:
+                self.profiles[row] = self.profiles[last]
+                self._encoding_buffer[row] = self._encoding_buffer[last]
+                self._norm_buffer[row] = self._norm_buffer[last]
+                self._id_buffer[row] = self._id_buffer[last]
+                self.rows[int(self._id_buffer[row])] = row
+
+            self.profiles.pop()
+            self._publish()
+            return True
+
+    def _reserve(self, size):
+        """Grow the backing buffers geometrically so appends are amortised O(1)"""
+        capacity = len(self._encoding_buffer)
+        if size <= capacity:
+            return
+
+        capacity = max(size, capacity * 2, 64)
+        used = len(self.profiles)
+
+        encodings = np.empty((capacity, self.dimensions), dtype=np.float32)
+        encodings[:used] = self._encoding_buffer[:used]
+        norms = np.empty(capacity, dtype=np.float32)
+        norms[:used] = self._norm_buffer[:used]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:used] = self._id_buffer[:used]
+
+        self._encoding_buffer = encodings
+        self._norm_buffer = norms
+        self._id_buffer = ids
+
+    def _make_writable(self):
+        # A shared read-only matrix (see load_arrays) gets a private copy before the first change
+        if not self._encoding_buffer.flags.writeable:
+            self._encoding_buffer = self._encoding_buffer.copy()
+
+    def _publish(self):
+        # Expose the used rows and invalidate any index built on older contents
+        count = len(self.profiles)
+        self.encodings = self._encoding_buffer[:count]
+        self.norms = self._norm_buffer[:count]
+        self.ids = self._id_buffer[:count]
+        self.version += 1
+
+    def build_index(self, index):
+        """
+        Build an approximate index over the current gallery and attach it.
+        The build runs outside the gallery lock so recognition keeps using exact
+        search meanwhile. Returns True if the index was trained and attached.
+        """
+        with self.lock:
+            encodings = self.encodings.copy()  # Rows may change in place while building
+            version = self.version
+
+        if not index.build(encodings):
+            return False
+
+        with self.lock:
+            # Discard the index if the gallery changed while it was building
+            if version != self.version:
+                return False
+            self.index = index
+            self.index_version = version
+        return True
+
+    @property
+    def uses_index(self):
+        return (self.index is not None and self.index.is_trained
+                and self.index_version == self.version)
+
+    def distances(self, probes):
+        """
+        Euclidean distance between every probe and every gallery encoding.
+        Returns an (M, N) float32 matrix, equivalent to face_recognition.face_distance.
+        """
+        probes = self._as_probe_matrix(probes)
+        with self.lock:
+            return self._distances(probes, self.encodings, self.norms)
+
+    def best_match(self, probe, threshold):
+        """
+        Best gallery match for a single probe encoding.
+        Returns (profile, confidence), with profile None if nothing passes the threshold.
+        """
+        return self.best_matches([probe], threshold)[0]
+
+    def best_matches(self, probes, threshold):
+        """
+        Best gallery match for each probe encoding in one vectorized call.
+
+        A match is accepted only when confidence (1 - distance) is strictly greater
+        than threshold, matching the original per-employee comparison loop.
+        """
+        results = []
+        for row in self.top_k(probes, k=1):
+            if row and row[0][1] > threshold:
+                results.append(row[0])
+            else:
+                results.append((None, 0))
+        return results
+
+    def top_k(self, probes, k=5):
+        """
+        The k closest gallery entries for each probe, best first.
+        Returns one list of (profile, confidence) pairs per probe.
+        """
+        probes = self._as_probe_matrix(probes)
+
+        # Rows are resolved under the lock: upsert/remove move profiles between rows in place
+        with self.lock:
+            indices, distances = self._search(probes, k)
+            return [
+                [(self.profiles[idx], float(1 - dist)) for idx, dist in zip(row_idx, row_dist) if idx >= 0]
+                for row_idx, row_dist in zip(indices, distances)
+            ]
+
+    def _search(self, probes, k):
+        """k-nearest search; returns (indices, distances), both (M, k) sorted by distance"""
+        if len(self.profiles) == 0 or k <= 0:
+            empty = np.empty((len(probes), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        if self.uses_index:
+            return self.index.search(probes, k)
+
+        distances = self._distances(probes, self.encodings, self.norms)
+        k = min(k, distances.shape[1])
+
+        if k == 1:
+            indices = np.argmin(distances, axis=1)[:, None]
+        else:
+            # Partial sort first, then order only the k survivors
+            indices = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(distances, indices, axis=1), axis=1, kind='stable')
+            indices = np.take_along_axis(indices, order, axis=1)
+
+        return indices, np.take_along_axis(distances, indices, axis=1)
+
+    @staticmethod
+    def _distances(probes, encodings, norms):
+        # ||p - g||^2 = ||p||^2 - 2 p.g + ||g||^2, clipped against float32 round-off
+        probe_norms = np.einsum('ij,ij->i', probes, probes)
+        squared = probe_norms[:, None] - 2.0 * (probes @ encodings.T) + norms[None, :]
+        np.maximum(squared, 0, out=squared)
+        return np.sqrt(squared, out=squared)
+
+    def _as_probe_matrix(self, probes):
+        probes = np.asarray(probes, dtype=np.float32)
+        if probes.ndim == 1:
+            probes = probes[None, :]
+        return np.ascontiguousarray(probes.reshape(-1, self.dimensions))
@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+from collections import Counter
+from threading import Lock
+
+
+class FaceQualityGate:
+    """
+    Cheap quality check run before a face is sent for embedding.
+
+    Faces that are too small, seen in profile or too blurred almost never pass
+    the recognition threshold, so their dlib embedding is skipped (the tracker
+    simply retries on a later frame). Checks run cheapest first and the first
+    failing check is recorded as the skip reason.
+    """
+
+    REASON_SIZE = 'too-small'
+    REASON_POSE = 'not-frontal'
+    REASON_BLUR = 'blurry'
+
+    # MediaPipe face detection keypoint order
+    RIGHT_EYE = 0
+    LEFT_EYE = 1
+    NOSE_TIP = 2
+
+    def __init__(self, min_face_size=40, max_yaw=0.35, min_sharpness=30.0, sharpness_width=64):
+        self.min_face_size = min_face_size  # Minimum box side in full-resolution pixels
+        self.max_yaw = max_yaw  # Nose offset from the eye midpoint, relative to eye distance
+        self.min_sharpness = min_sharpness  # Minimum variance of the Laplacian
+        self.sharpness_width = sharpness_width  # Crop width used for the sharpness measure
+
+        self.lock = Lock()
+        self.skip_counts = Counter()
+        self.passed = 0
+
+    def check(self, rgb_frame, bbox, keypoints=None):
+        """
+        Assess one face given its (x, y, w, h) box and relative MediaPipe keypoints.
+        Returns None if the face should be embedded, otherwise the skip reason.
+        """
+        reason = self._first_failure(rgb_frame, bbox, keypoints)
+        with self.lock:
+            if reason:
+                self.skip_counts[reason] += 1
+            else:
+                self.passed += 1
+        return reason
+
+    def stats(self):
+        """Passed/skipped counters, per skip reason"""
+        with self.lock:
+            skipped = dict(self.skip_counts)
+            passed = self.passed
+        return {'passed': passed, 'skipped': sum(skipped.values()), 'skip_reasons': skipped}
+
+    def _first_failure(self, rgb_frame, bbox, keypoints):
+        x, y, w, h = bbox
+        if min(w, h) < self.min_face_size:
+            return self.REASON_SIZE
+
+        if keypoints and self.frontal_yaw(keypoints) > self.max_yaw:
+            return self.REASON_POSE
+
+        if self.sharpness(rgb_frame[y:y + h, x:x + w]) < self.min_sharpness:
+            return self.REASON_BLUR
+
+        return None
+
+    def frontal_yaw(self, keypoints):
+        """
+        Horizontal nose offset from the midpoint between the eyes, in units of the
+        eye distance: about 0 for a frontal face, growing towards profile views.
+        """
+        right_eye = keypoints[self.RIGHT_EYE]
+        left_eye = keypoints[self.LEFT_EYE]
+        nose = keypoints[self.NOSE_TIP]
+
+        eye_distance = abs(left_eye[0] - right_eye[0])
+        if eye_distance <= 0:
+            return float('inf')
+
+        eye_mid_x = (left_eye[0] + right_eye[0]) / 2.0
+        return abs(nose[0] - eye_mid_x) / eye_distance
+
+    def sharpness(self, crop):
+        """Variance of the Laplacian on a small grayscale copy of the face crop"""
+        if crop.size == 0:
+            return 0.0
+
+        gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+        if gray.shape[1] > self.sharpness_width:
+            scale = self.sharpness_width / float(gray.shape[1])
+            gray = cv2.resize(gray, (self.sharpness_width, max(1, int(gray.shape[0] * scale))),
+                              interpolation=cv2.INTER_AREA)
+
+        return float(np.var(cv2.Laplacian(gray, cv2.CV_64F)))
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Intersection over Union between every pair of (x, y, w, h) boxes.
+    Returns an (len(boxes_a), len(boxes_b)) float matrix computed with broadcasting.
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+
+    # Intersection rectangle for every pair (negative extents mean no overlap)
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    intersection = inter_w * inter_h
+
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def greedy_assignment(scores, min_score):
+    """
+    One-to-one assignment by taking pairs in order of decreasing score.
+    Only pairs with score strictly greater than min_score are considered.
+    Returns (matches, unmatched_rows, unmatched_cols) with matches as (row, col) pairs.
+    """
+    scores = np.asarray(scores)
+    rows, cols = np.nonzero(scores > min_score)
+    order = np.argsort(-scores[rows, cols], kind='stable')
+
+    matches = []
+    used_rows = set()
+    used_cols = set()
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matches.append((row, col))
+
+    unmatched_rows = [i for i in range(scores.shape[0]) if i not in used_rows]
+    unmatched_cols = [j for j in range(scores.shape[1]) if j not in used_cols]
+    return matches, unmatched_rows, unmatched_cols
+
+
+def match_detections(tracker_bboxes, detection_bboxes, min_iou=0.3):
+    """
+    Match tracked boxes to new detections so no detection is claimed twice.
+    Returns (matches, unmatched_trackers, unmatched_detections) as index lists.
+    """
+    if len(tracker_bboxes) == 0 or len(detection_bboxes) == 0:
+        return [], list(range(len(tracker_bboxes))), list(range(len(detection_bboxes)))
+
+    return greedy_assignment(iou_matrix(tracker_bboxes, detection_bboxes), min_iou)
+
+
+def update_velocity(velocity, previous_bbox, bbox, frames, smoothing=0.5):
+    """
+    Exponentially smoothed per-frame velocity of an (x, y, w, h) box,
+    measured from its previous detection `frames` frames ago.
+    """
+    if frames <= 0:
+        return velocity
+
+    measured = (np.asarray(bbox, dtype=np.float64) - np.asarray(previous_bbox, dtype=np.float64)) / frames
+    return tuple((smoothing * measured + (1 - smoothing) * np.asarray(velocity, dtype=np.float64)).tolist())
+
+
+def predict_bbox(bbox, velocity, frames, frame_size):
+    """
+    Constant-velocity prediction of an (x, y, w, h) box `frames` frames ahead,
+    clipped to the (width, height) frame.
+    """
+    x, y, w, h = (np.asarray(bbox, dtype=np.float64) + np.asarray(velocity, dtype=np.float64) * frames).tolist()
+    frame_w, frame_h = frame_size
+
+    w = max(1.0, min(w, frame_w))
+    h = max(1.0, min(h, frame_h))
+    x = min(max(0.0, x), frame_w - w)
+    y = min(max(0.0, y), frame_h - h)
+    return int(round(x)), int(round(y)), int(round(w)), int(round(h))
+
+
+def prediction_plausible(bbox, velocity, frames, frame_size, max_scale_change=2.0, min_visible=0.5):
+    """
+    Sanity check of a constant-velocity prediction `frames` frames ahead: the
+    predicted (x, y, w, h) box must keep its size within max_scale_change of the
+    detected one and keep at least min_visible of its area inside the frame.
+    A failed check means the track is probably lost (face left or moved erratically).
+    """
+    x, y, w, h = (np.asarray(bbox, dtype=np.float64) + np.asarray(velocity, dtype=np.float64) * frames).tolist()
+    if w <= 0 or h <= 0:
+        return False
+
+    scale = (w * h) / max(1.0, float(bbox[2] * bbox[3]))
+    if not 1.0 / max_scale_change ** 2 <= scale <= max_scale_change ** 2:
+        return False
+
+    frame_w, frame_h = frame_size
+    visible_w = max(0.0, min(x + w, frame_w) - max(x, 0.0))
+    visible_h = max(0.0, min(y + h, frame_h) - max(y, 0.0))
+    return visible_w * visible_h >= min_visible * w * h
@@ -0,0 +1,156 @@
+import time
+from collections import deque
+from threading import Condition
+
+
+class FrameSlot:
+    """
+    Latest-frame-wins handoff between the capture thread and recognition.
+
+    Holds at most `capacity` frames. Publishing into a full slot drops the
+    oldest frame instead of blocking or queueing, so the consumer always works
+    on recent frames and end-to-end latency stays bounded by one processing
+    step however slow recognition is. Every frame is stamped with a sequence
+    number, its capture time and an optional motion flag; dropped frames are
+    counted as superseded and passed to on_superseded (e.g. to release a pooled
+    buffer). Motion seen in a dropped frame carries over to its replacement,
+    so a short movement is never lost to a slow consumer.
+    Consumers block in get() and are woken as soon as a frame is published.
+    """
+
+    def __init__(self, capacity=1, on_superseded=None):
+        self.capacity = capacity
+        self.on_superseded = on_superseded
+        self.listeners = []  # Called after every publish, e.g. by a FrameScheduler
+        self.frames = deque()  # (seq, timestamp, frame, motion), oldest first
+        self.condition = Condition()
+        self.seq = 0  # Sequence number of the last published frame
+
+        # Metrics
+        self.published_frames = 0
+        self.consumed_frames = 0
+        self.superseded_frames = 0
+
+    def put(self, frame, timestamp=None, motion=None):
+        """
+        Publish a frame, dropping the oldest one if the slot is full.
+        motion is True/False when the producer measured it, None otherwise.
+        Returns the frame's sequence number.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        superseded = []
+        with self.condition:
+            self.seq += 1
+            seq = self.seq
+            while len(self.frames) >= self.capacity:
+                _, _, old_frame, old_motion = self.frames.popleft()
+                superseded.append(old_frame)
+                self.superseded_frames += 1
+                if old_motion:
+                    motion = True
+            self.frames.append((seq, timestamp, frame, motion))
+            self.published_frames += 1
+            self.condition.notify()
+
+        if self.on_superseded:
+            for old_frame in superseded:
+                self.on_superseded(old_frame)
+        for listener in self.listeners:
+            listener()
+        return seq
+
+    def get(self, timeout=None):
+        """
+        Wait for a frame and take the oldest held one as (seq, timestamp, frame, motion).
+        Returns None on timeout or when woken by wake() with nothing to deliver.
+        """
+        with self.condition:
+            if not self.frames:
+                self.condition.wait(timeout)
+            if not self.frames:
+                return None
+            self.consumed_frames += 1
+            return self.frames.popleft()
+
+    def get_nowait(self):
+        """Take the oldest held frame as (seq, timestamp, frame, motion), or None if the slot is empty"""
+        with self.condition:
+            if not self.frames:
+                return None
+            self.consumed_frames += 1
+            return self.frames.popleft()
+
+    def wake(self):
+        """Release every consumer blocked in get(), e.g. so it can notice a shutdown"""
+        with self.condition:
+            self.condition.notify_all()
+
+    def empty(self):
+        with self.condition:
+            return not self.frames
+
+    def stats(self):
+        with self.condition:
+            return {
+                'capacity': self.capacity,
+                'depth': len(self.frames),
+                'last_seq': self.seq,
+                'published_frames': self.published_frames,
+                'consumed_frames': self.consumed_frames,
+                'superseded_frames': self.superseded_frames
+            }
+
+
+class FrameScheduler:
+    """
+    Fair consumer side of several FrameSlots, one per camera.
+
+    get() serves the slots round-robin, starting after the camera served last,
+    so a busy camera cannot starve the others; with latest-frame-wins slots
+    every camera gets at most one frame per round. The consumer sleeps on one
+    condition until any slot publishes.
+    """
+
+    def __init__(self):
+        self.condition = Condition()
+        self.slots = []  # (key, FrameSlot) in registration order
+        self.next_index = 0
+
+    def add(self, key, slot):
+        with self.condition:
+            self.slots.append((key, slot))
+        slot.listeners.append(self._notify)
+
+    def get(self, timeout=None):
+        """
+        Take the next frame as (key, (seq, timestamp, frame, motion)), or None on timeout
+        or when woken by wake() with nothing to deliver.
+        """
+        with self.condition:
+            item = self._take_next()
+            if item is None:
+                self.condition.wait(timeout)
+                item = self._take_next()
+            return item
+
+    def wake(self):
+        """Release a consumer blocked in get(), e.g. so it can notice a shutdown"""
+        with self.condition:
+            self.condition.notify_all()
+
+    def _take_next(self):
+        count = len(self.slots)
+        for offset in range(count):
+            index = (self.next_index + offset) % count
+            key, slot = self.slots[index]
+            item = slot.get_nowait()
+            if item is not None:
+                self.next_index = (index + 1) % count
+                return key, item
+        return None
+
+    def _notify(self):
+        with self.condition:
+            self.condition.notify()
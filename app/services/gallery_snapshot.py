@@ -0,0 +1,124 @@
+import json
+import os
+import uuid
+from datetime import timezone
+import numpy as np
+from app import logger
+from app.services.face_encoding import ENCODING_DIMENSIONS, ENCODING_DTYPE
+
+SNAPSHOT_FORMAT = 2
+INDEX_FILE = 'gallery.json'
+PROFILE_FIELDS = ('name', 'position', 'email', 'phone')  # Stored as one JSON list per field
+
+
+class GallerySnapshot:
+    """
+    The recognition gallery persisted on disk, so a process can start without
+    reading the employee table.
+
+    A snapshot is an (N, 128) float32 .npy matrix, int64 id and datetime64
+    updated_at .npy arrays, and a JSON index holding the remaining profile
+    fields column by column (much faster to parse than one object per row)
+    and the database version it was built from (DatabaseService.gallery_version). The matrix is opened with
+    np.load(mmap_mode='r'): loading costs no copy, and every process mapping the
+    same file shares its pages in the OS page cache.
+
+    Each save writes new uniquely named .npy files and then atomically replaces
+    the index, so readers always see a complete snapshot and processes that
+    still map an older matrix keep their pages until they let go of them.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+
+    def load(self, version):
+        """
+        (profiles, ids, encodings) of the snapshot if it was built from this
+        database version, else None. encodings is a read-only memory map.
+        """
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable gallery snapshot index: {e}")
+            return None
+
+        if index.get('format') != SNAPSHOT_FORMAT or index.get('version') != version:
+            logger.info("Gallery snapshot is stale, loading the gallery from the database")
+            return None
+
+        try:
+            encodings = np.load(os.path.join(self.directory, index['encodings']), mmap_mode='r')
+            ids = np.load(os.path.join(self.directory, index['ids']))
+            updated = np.load(os.path.join(self.directory, index['updated_at']))
+            columns = [index[field] for field in PROFILE_FIELDS]
+            count = len(ids)
+            if any(len(column) != count for column in columns):
+                raise ValueError("snapshot profile fields do not match its ids")
+            if encodings.dtype != ENCODING_DTYPE or encodings.shape != (count, ENCODING_DIMENSIONS) \
+                    or ids.shape != (count,) or updated.shape != (count,):
+                raise ValueError(f"snapshot arrays do not match its {count} profiles")
+        except Exception as e:
+            logger.warning(f"Invalid gallery snapshot: {e}")
+            return None
+
+        # Plain ndarray view of the mapping; profile encodings are rows of it.
+        # datetime64[us].tolist() yields naive datetimes (None for NaT) without parsing strings
+        encodings = np.asarray(encodings)
+        profiles = [
+            {"id": employee_id, "name": name, "position": position, "email": email, "phone": phone,
+             "updated_at": updated_at, "encoding": encoding}
+            for employee_id, name, position, email, phone, updated_at, encoding
+            in zip(ids.tolist(), *columns, updated.tolist(), list(encodings))
+        ]
+        logger.info(f"Memory-mapped gallery snapshot with {count} employee profiles")
+        return profiles, ids, encodings
+
+    def save(self, version, profiles, ids, encodings):
+        """Write a snapshot of these gallery arrays, tagged with the database version they were read at"""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"gallery-{uuid.uuid4().hex}"
+        encodings_file = f"{name}.npy"
+        ids_file = f"{name}-ids.npy"
+        updated_file = f"{name}-updated.npy"
+
+        np.save(os.path.join(self.directory, encodings_file),
+                np.ascontiguousarray(encodings, dtype=ENCODING_DTYPE).reshape(-1, ENCODING_DIMENSIONS))
+        np.save(os.path.join(self.directory, ids_file), np.asarray(ids, dtype=np.int64))
+        np.save(os.path.join(self.directory, updated_file),
+                np.array([_naive_utc(profile["updated_at"]) for profile in profiles], dtype='datetime64[us]'))
+
+        index = {
+            'format': SNAPSHOT_FORMAT,
+            'version': version,
+            'encodings': encodings_file,
+            'ids': ids_file,
+            'updated_at': updated_file,
+            **{field: [profile[field] for profile in profiles] for field in PROFILE_FIELDS}
+        }
+        temp_path = f"{self.index_path}.{name}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(temp_path, self.index_path)
+
+        self._remove_unused(encodings_file, ids_file, updated_file)
+        logger.info(f"Saved gallery snapshot with {len(profiles)} employee profiles")
+
+    def _remove_unused(self, *keep):
+        # Mapped files can't be deleted on Windows; they are retried after the next save
+        for filename in os.listdir(self.directory):
+            if filename.startswith('gallery-') and filename.endswith('.npy') and filename not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+
+
+def _naive_utc(value):
+    """updated_at as stored by SQLite (naive UTC); NaT for None"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
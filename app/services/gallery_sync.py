@@ -0,0 +1,178 @@
+from queue import Queue, Empty
+from threading import Thread, Lock
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import logger
+from app.models import Employee
+
+# Callbacks receiving committed (operation, employee_id) gallery changes
+_listeners = []
+_listeners_lock = Lock()
+
+OP_UPSERT = 'upsert'
+OP_REMOVE = 'remove'
+
+
+def add_gallery_listener(callback):
+    with _listeners_lock:
+        _listeners.append(callback)
+
+
+def remove_gallery_listener(callback):
+    with _listeners_lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+def _record_change(target, operation):
+    # Hold the change on the session until it commits; rolled back changes are never published
+    session = object_session(target)
+    if session is None:
+        _publish([(operation, target.id)])
+        return
+    session.info.setdefault('gallery_changes', []).append((operation, target.id))
+
+
+@event.listens_for(Employee, 'after_insert')
+@event.listens_for(Employee, 'after_update')
+def _employee_saved(mapper, connection, target):
+    _record_change(target, OP_UPSERT)
+
+
+@event.listens_for(Employee, 'after_delete')
+def _employee_deleted(mapper, connection, target):
+    _record_change(target, OP_REMOVE)
+
+
+@event.listens_for(Session, 'after_commit')
+def _session_committed(session):
+    changes = session.info.pop('gallery_changes', None)
+    if changes:
+        _publish(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _session_rolled_back(session, previous_transaction):
+    session.info.pop('gallery_changes', None)
+
+
+def _publish(changes):
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for callback in listeners:
+        try:
+            callback(changes)
+        except Exception as e:
+            logger.error(f"Gallery change listener failed: {e}")
+
+
+class GallerySync:
+    """
+    Applies employee enrolment changes to a live FaceGallery.
+
+    Every committed insert, update or delete of an Employee in this process
+    (admin add/edit/delete, /upload) is queued as a delta keyed by employee id.
+    A background thread loads only the changed rows, skips any whose updated_at
+    is not newer than what the gallery already holds, and upserts or removes
+    them in place, so recognition never waits and the table is never reloaded.
+    """
+
+    def __init__(self, app, db_service, gallery, on_change=None):
+        self.app = app
+        self.db_service = db_service
+        self.gallery = gallery
+        self.on_change = on_change  # Called after a batch of deltas has been applied
+
+        self.queue = Queue()
+        self.thread = None
+        self.running = False
+
+        # Metrics
+        self.applied_upserts = 0
+        self.applied_removals = 0
+        self.skipped_deltas = 0
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        add_gallery_listener(self.enqueue)
+        self.thread = Thread(target=self._sync_loop, name="gallery-sync", daemon=True)
+        self.thread.start()
+        logger.info("Gallery sync started")
+
+    def stop(self):
+        if not self.running:
+            return
+
+        self.running = False
+        remove_gallery_listener(self.enqueue)
+        self.queue.put(None)
+        self.thread.join(timeout=2)
+        logger.info("Gallery sync stopped")
+
+    def enqueue(self, changes):
+        """Queue (operation, employee_id) deltas; safe to call from any thread"""
+        for change in changes:
+            self.queue.put(change)
+
+    def _sync_loop(self):
+        while self.running:
+            change = self.queue.get()
+            if change is None:
+                break
+
+            # Coalesce everything queued so far; the last operation per employee wins
+            pending = {change[1]: change[0]}
+            while True:
+                try:
+                    change = self.queue.get_nowait()
+                except Empty:
+                    break
+                if change is None:
+                    self.running = False
+                    break
+                pending[change[1]] = change[0]
+
+            try:
+                self._apply(pending)
+            except Exception as e:
+                logger.error(f"Failed to apply gallery changes: {e}")
+
+    def _apply(self, pending):
+        upsert_ids = [employee_id for employee_id, op in pending.items() if op == OP_UPSERT]
+        removed = [employee_id for employee_id, op in pending.items() if op == OP_REMOVE]
+
+        profiles = {}
+        if upsert_ids:
+            with self.app.app_context():
+                profiles = self.db_service.load_employee_profiles(upsert_ids)
+
+        changed = False
+        for employee_id in upsert_ids:
+            profile = profiles.get(employee_id)
+            if profile is None:
+                # Deleted meanwhile, or no usable encoding any more
+                removed.append(employee_id)
+                continue
+
+            current = self.gallery.get(employee_id)
+            if current is not None and current.get('updated_at') and profile['updated_at'] \
+                    and profile['updated_at'] <= current['updated_at']:
+                self.skipped_deltas += 1
+                continue
+
+            self.gallery.upsert(profile)
+            self.applied_upserts += 1
+            changed = True
+
+        for employee_id in removed:
+            if self.gallery.remove(employee_id):
+                self.applied_removals += 1
+                changed = True
+
+        if changed:
+            logger.info(f"Gallery updated incrementally: {len(self.gallery)} employees")
+            if self.on_change:
+                self.on_change()
@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+
+
+class ImageEnhancer:
+    """
+    Brightness/contrast, saturation, gray-world white balance and denoising
+    for captured frames, done entirely in uint8.
+
+    Brightness and contrast are folded into one lookup table, saturation is a
+    lookup table on the S channel of an HSV copy, and the white balance gains
+    become a per-channel lookup table. Gains are measured only every
+    wb_interval frames; in between the cached table is reused. Tables are
+    rebuilt when a setting changes. Scratch buffers are reused, so a frame of
+    unchanged size allocates nothing.
+    """
+
+    def __init__(self, brightness=0, contrast=10, saturation=10, auto_white_balance=True,
+                 denoise=True, wb_interval=10):
+        self.brightness = brightness  # -50 to 50
+        self.contrast = contrast  # -50 to 50
+        self.saturation = saturation  # -50 to 50
+        self.auto_white_balance = auto_white_balance
+        self.denoise = denoise  # 3x3 Gaussian blur for better face recognition
+        self.wb_interval = wb_interval  # Frames between white balance gain updates
+
+        self.tone_lut = None  # Brightness/contrast, same table for every channel
+        self.saturation_lut = None  # Identity on H and V, saturation scale on S
+        self.wb_lut = None  # Per-channel white balance gains
+        self.wb_gains = None
+        self.frames_since_wb = 0
+        self._settings = None
+        self._buffers = {}
+
+    def enhance(self, frame, out=None):
+        """Enhance a BGR uint8 frame; the input is never modified and the result is written to out when given"""
+        self._update_tables()
+
+        result = frame
+        if self.tone_lut is not None:
+            result = cv2.LUT(result, self.tone_lut, dst=self._buffer('tone', frame.shape))
+
+        if self.saturation_lut is not None:
+            hsv = cv2.cvtColor(result, cv2.COLOR_BGR2HSV, dst=self._buffer('hsv', frame.shape))
+            cv2.LUT(hsv, self.saturation_lut, dst=hsv)
+            result = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=self._buffer('color', frame.shape))
+
+        if self.auto_white_balance:
+            if self.wb_lut is None or self.frames_since_wb >= self.wb_interval:
+                self._update_white_balance(result)
+            self.frames_since_wb += 1
+            result = cv2.LUT(result, self.wb_lut, dst=self._buffer('balance', frame.shape))
+
+        if self.denoise:
+            return cv2.GaussianBlur(result, (3, 3), 0, dst=out)
+
+        if out is not None:
+            np.copyto(out, result)
+            return out
+        return result.copy() if result is not frame else frame
+
+    def _update_tables(self):
+        settings = (self.brightness, self.contrast, self.saturation, self.auto_white_balance)
+        if settings == self._settings:
+            return
+        self._settings = settings
+
+        values = np.arange(256, dtype=np.float64)
+
+        # Brightness then contrast around mid-gray, clipped and truncated like the float path
+        self.tone_lut = None
+        if self.brightness != 0 or self.contrast != 0:
+            tone = values + self.brightness
+            if self.contrast != 0:
+                factor = (259 * (self.contrast + 255)) / (255 * (259 - self.contrast))
+                tone = factor * (tone - 128) + 128
+            self.tone_lut = np.clip(tone, 0, 255).astype(np.uint8)
+
+        self.saturation_lut = None
+        if self.saturation != 0:
+            identity = np.arange(256, dtype=np.uint8)
+            scaled = np.clip(values * (1 + self.saturation / 100), 0, 255).astype(np.uint8)
+            self.saturation_lut = np.dstack([identity, scaled, identity]).reshape(256, 1, 3)
+
+        # Settings changed the image statistics: measure white balance again
+        self.wb_lut = None
+
+    def _update_white_balance(self, frame):
+        """Gray-world gains from the channel means of the frame"""
+        b_avg, g_avg, r_avg = cv2.mean(frame)[:3]
+        k = (b_avg + g_avg + r_avg) / 3
+
+        self.wb_gains = tuple(k / avg if avg > 0 else 1 for avg in (b_avg, g_avg, r_avg))
+        values = np.arange(256, dtype=np.float64)
+        channels = [np.clip(np.round(values * gain), 0, 255).astype(np.uint8) for gain in self.wb_gains]
+        self.wb_lut = np.dstack(channels).reshape(256, 1, 3)
+        self.frames_since_wb = 0
+
+    def _buffer(self, name, shape):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self._buffers[name] = buffer
+        return buffer
@@ -0,0 +1,211 @@
+import bisect
+import threading
+import weakref
+
+# Seconds; fine steps around one frame time at 10-30 FPS
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _ThreadShards:
+    """
+    Per-thread value arrays. Each thread only ever writes its own array, so
+    recording takes no lock; a scrape sums the arrays of every thread.
+    The lock is only taken the first time a thread records a value.
+
+    Arrays of threads that have exited (reconnected capture threads, request
+    threads) are folded into one retired array, so totals stay monotonic and
+    the number of arrays stays bounded by the number of live threads.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = []  # (weak reference to the owning thread, values)
+        self.retired = [0] * size  # Summed values of threads that have exited
+
+    def get(self):
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = [0] * self.size
+            with self.lock:
+                self._retire_dead()
+                self.shards.append((weakref.ref(threading.current_thread()), shard))
+            self.local.shard = shard
+        return shard
+
+    def total(self):
+        with self.lock:
+            self._retire_dead()
+            arrays = [self.retired] + [shard for _, shard in self.shards]
+            return [sum(values) for values in zip(*arrays)]
+
+    def _retire_dead(self):
+        # Called with the lock held; an exited thread can no longer write its array
+        live = []
+        for owner, shard in self.shards:
+            thread = owner()
+            if thread is not None and thread.is_alive():
+                live.append((owner, shard))
+                continue
+            for i, value in enumerate(shard):
+                self.retired[i] += value
+        self.shards = live
+
+
+class Counter:
+    """Monotonic count of one label combination"""
+
+    def __init__(self):
+        self.shards = _ThreadShards(1)
+
+    def inc(self, amount=1):
+        self.shards.get()[0] += amount
+
+    def value(self):
+        return self.shards.total()[0]
+
+
+class Histogram:
+    """Bucketed distribution of one label combination (Prometheus le semantics)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Per-bucket counts, one overflow (+Inf) bucket, then the sum of observed values
+        self.shards = _ThreadShards(len(buckets) + 2)
+
+    def observe(self, value):
+        shard = self.shards.get()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """(cumulative bucket counts including +Inf, count, sum)"""
+        values = self.shards.total()
+        cumulative = []
+        running = 0
+        for count in values[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, values[-1]
+
+
+class MetricFamily:
+    """A named metric with one Counter or Histogram per label combination"""
+
+    def __init__(self, name, help, kind, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.kind = kind  # 'counter' or 'histogram'
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children = {}  # Label values -> Counter/Histogram
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        """The child for these label values, created on first use"""
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.get(values)
+                if child is None:
+                    child = Counter() if self.kind == 'counter' else Histogram(self.buckets)
+                    self.children[values] = child
+        return child
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        with self.lock:
+            children = list(self.children.items())
+
+        for values, child in children:
+            labels = dict(zip(self.labelnames, values))
+            if self.kind == 'counter':
+                lines.append(f"{self.name}{format_labels(labels)} {format_value(child.value())}")
+                continue
+
+            cumulative, count, total = child.snapshot()
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), cumulative):
+                lines.append(f"{self.name}_bucket{format_labels(dict(labels, le=format_value(bound)))} "
+                             f"{bucket_count}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics rendered in the Prometheus text format for /metrics.
+
+    Hot paths record into counters and histograms; values the services already
+    track in their stats() (queue depths, superseded frames, viewers, ...) are
+    read at scrape time by collectors, so they cost nothing between scrapes.
+    A collector is a callable returning (name, type, help, labels, value) samples.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.families = {}
+        self.collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        return self._family(name, help, 'counter', labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._family(name, help, 'histogram', labelnames, buckets)
+
+    def add_collector(self, collector):
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self):
+        with self.lock:
+            families = list(self.families.values())
+            collectors = list(self.collectors)
+
+        lines = []
+        for family in families:
+            family.render(lines)
+
+        # Collected samples are grouped by metric name so each gets one HELP/TYPE header
+        samples = {}
+        for collector in collectors:
+            for name, kind, help, labels, value in collector():
+                samples.setdefault(name, (kind, help, []))[2].append((labels, value))
+        for name, (kind, help, values) in samples.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+    def _family(self, name, help, kind, labelnames, buckets=DEFAULT_BUCKETS):
+        """Existing family of that name (every camera's service shares one), or a new one"""
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = MetricFamily(name, help, kind, labelnames, buckets)
+                self.families[name] = family
+            return family
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
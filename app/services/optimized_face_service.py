@@ -8,11 +8,87 @@ from threading import Thread, Lock
 from queue import Queue
 from app import logger
 from app.services.db_service import DatabaseService
+from app.services.face_gallery import FaceGallery
+from app.services.ann_index import IVFIndex
+from app.services.embedding_pool import EmbeddingWorkerPool
+from app.services.face_tracker import match_detections, update_velocity, predict_bbox, prediction_plausible
+from app.services.face_quality import FaceQualityGate
+from app.services.attendance_writer import AttendanceWriter
+from app.services.gallery_sync import GallerySync
+from app.services.gallery_snapshot import GallerySnapshot
+from app.services.frame_slot import FrameSlot, FrameScheduler
+from app.services.metrics import registry
 from flask import current_app
 from collections import defaultdict
 
+class CameraRecognitionState:
+    """Recognition state and metrics of one camera served by OptimizedFaceService"""
+
+    def __init__(self, camera_id, frame_slot=None):
+        self.camera_id = camera_id
+        self.frame_slot = frame_slot
+
+        self.faces = []  # Published (x, y, w, h, label, landmarks) list for rendering
+        self.face_trackers = {}  # Track faces across frames
+        self.frame_count = 0
+        self.frames_since_detection = 0
+        self.last_frame_seq = 0  # Sequence number of the last processed frame
+
+        # Results finished for this camera, applied on its next frame
+        self.embedding_results = []
+        self.attendance_results = []
+
+        # Metrics
+        self.processed_frames = 0
+        self.detection_frames = 0  # Frames that ran full face detection
+        self.motion_skipped_frames = 0  # Motionless frames skipped while nothing was tracked
+        self.last_detection_time = 0
+        self.fps_values = []
+        self.frame_latency_values = []  # Capture-to-result latency of recent frames, in seconds
+        self.processing_time_values = []  # Time spent in _process_frame, in seconds
+
+        # Prometheus metrics, exported at /metrics
+        stage_seconds = registry.histogram('recognition_stage_seconds', "Time spent in each recognition stage",
+                                           ('camera', 'stage'))
+        self.stage_seconds = {stage: stage_seconds.labels(camera_id, stage)
+                              for stage in ('frame', 'detection', 'embedding', 'matching', 'landmarks')}
+        self.lag_seconds = registry.histogram('recognition_lag_seconds', "Capture-to-result latency of processed frames",
+                                              ('camera',)).labels(camera_id)
+
+    def stats(self):
+        return {
+            'processed_frames': self.processed_frames,
+            'detection_frames': self.detection_frames,
+            'motion_skipped_frames': self.motion_skipped_frames,
+            'motion_skip_ratio': self.motion_skipped_frames / self.processed_frames if self.processed_frames else 0,
+            'fps': sum(self.fps_values) / len(self.fps_values) if self.fps_values else 0,
+            'latency_ms': sum(self.frame_latency_values) * 1000 / len(self.frame_latency_values)
+            if self.frame_latency_values else 0,
+            'processing_ms': sum(self.processing_time_values) * 1000 / len(self.processing_time_values)
+            if self.processing_time_values else 0,
+            'superseded_frames': self.frame_slot.superseded_frames if self.frame_slot else 0,
+            'trackers': len(self.face_trackers),
+            'faces': len(self.faces)
+        }
+
+
+def _camera_attribute(name):
+    """Attribute of the camera currently being processed by the detection thread"""
+    return property(lambda self: getattr(self.camera, name),
+                    lambda self, value: setattr(self.camera, name, value))
+
+
 class OptimizedFaceService:
-    def __init__(self, app=None):
+    # Per-camera state; the detection thread switches self.camera before processing each frame
+    faces = _camera_attribute('faces')
+    face_trackers = _camera_attribute('face_trackers')
+    frame_count = _camera_attribute('frame_count')
+    frames_since_detection = _camera_attribute('frames_since_detection')
+    last_frame_seq = _camera_attribute('last_frame_seq')
+    fps_values = _camera_attribute('fps_values')
+    frame_latency_values = _camera_attribute('frame_latency_values')
+
+    def __init__(self, app=None, embedding_workers=0, detection_interval=1, gallery_snapshot_dir=None):
         # Initialize MediaPipe face detection (faster than HOG)
         self.mp_face_detection = mp.solutions.face_detection
         self.face_detection = self.mp_face_detection.FaceDetection(
@@ -21,10 +97,11 @@ class OptimizedFaceService:
         )
 
         # Initialize face mesh for more accurate landmarks
+        # Only used on the detection thread, one tracker crop at a time, so each call is a fresh image
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=10,
+            static_image_mode=True,
+            max_num_faces=1,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
@@ -34,99 +111,311 @@ class OptimizedFaceService:
         self.mp_drawing_styles = mp.solutions.drawing_styles
 
         # State variables
-        self.faces = []
+        self.camera = CameraRecognitionState("main")  # Camera whose frame is being processed
+        self.cameras = {self.camera.camera_id: self.camera}
         self.face_lock = Lock()
         self.running = False
         self.thread = None
         self.db_service = DatabaseService()
         self.employee_profiles = []
+        self.gallery = FaceGallery()  # Vectorized matcher over employee_profiles
+        self.gallery_sync = None  # Applies enrolment changes to the gallery while running
+        self.index_lock = Lock()
+        self.index_building = False
+        self.index_rebuild_pending = False
         self.app = app
-        self.frame_queue = None
+        self.frame_scheduler = None  # Serves the cameras' frame slots round-robin
+
+        # Memory-mapped copy of the gallery for fast startup, rewritten after gallery changes
+        self.gallery_snapshot = GallerySnapshot(gallery_snapshot_dir) if gallery_snapshot_dir else None
+        self.snapshot_lock = Lock()
+        self.snapshot_saving = False
+        self.snapshot_save_pending = False
 
         # Performance optimization variables
         self.frame_skip = 1  # Process every frame for office cameras (more reliable)
-        self.frame_count = 0
         self.face_cache = defaultdict(dict)  # Cache for face tracking
         self.encoding_ttl = 30  # Frames before refreshing encoding (reduced for better accuracy)
         self.last_attendance_time = {}  # Track last attendance for each employee
         self.attendance_cooldown = 180  # 3 minutes in seconds (reduced for office environment)
+        self.attendance_writer = None  # Writes attendance off the detection thread
 
-        # Face tracking variables
-        self.face_trackers = {}  # Track faces across frames
-        self.next_face_id = 0
+        # Face tracking variables (trackers themselves are per camera)
+        self.next_face_id = 0  # Unique across cameras
         self.max_tracking_age = 30  # Maximum frames to keep tracking a face
+        self.min_tracking_iou = 0.3  # Minimum IoU to associate a detection with a tracker
+
+        # Detect-every-N-frames mode: trackers are moved by constant-velocity prediction in between
+        self.detection_interval = detection_interval  # 1 = run detection on every frame
+        # Trackers restart at confidence 1.0 on every detection and decay so that they only fall below
+        # min_track_confidence after detection_interval predicted frames; an implausible prediction
+        # (box leaving the frame or changing size) drops it to 0 and forces an early detection
+        self.min_track_confidence = 0.5
+
+        # Motionless frames are skipped entirely while no face is tracked
+        self.motion_gating = True  # Only applies to cameras that measure motion
+        self.idle_detection_interval = 5.0  # Seconds between safety detections on motionless frames (None = never)
+
+        # Detection runs on a downscaled copy; embeddings still use the full-resolution frame
+        self.detection_max_width = 640  # None = detect at full resolution
 
         # Recognition settings
         self.recognition_threshold = 0.55  # Lower threshold for better recognition in office
         self.use_small_model = True  # Use small model for faster processing
         self.jitter_count = 1  # Number of times to re-sample face for encoding
 
+        # Skip embedding for tiny, blurred or profile faces (retried on later frames)
+        self.enable_quality_gate = True
+        self.quality_gate = FaceQualityGate()
+
+        # Out-of-process embedding (0 = encode on the detection thread)
+        self.embedding_workers = embedding_workers
+        self.embedding_pool = None
+
+        # Approximate gallery search for very large deployments
+        self.use_ann_index = True
+        self.ann_min_gallery_size = 5000  # Smaller galleries always use exact search
+        self.ann_nlist = None  # Number of IVF cells (None = ~4*sqrt(N))
+        self.ann_nprobe = 8  # Cells scanned per probe (higher = better recall, slower)
+
         # Visualization settings
         self.show_landmarks = True  # Show facial landmarks for better visualization
+        self.landmark_interval = 5  # Frames between face mesh refreshes of a tracker
+        self.landmark_margin = 20  # Pixels around the face box given to the face mesh
         self.show_fps = True
-        self.fps_values = []
-        self.last_fps_time = time.time()
         self.show_recognition_score = True  # Show confidence score
 
-    def start(self, frame_queue):
+    def start(self, frame_slots):
+        """
+        Start recognition for every camera in frame_slots (camera_id -> FrameSlot;
+        a single FrameSlot is served as camera "main"). All cameras share the
+        detection thread, gallery, embedding workers and attendance writer.
+        """
         if self.running:
             return
 
-        self.running = True
-        self.frame_queue = frame_queue
+        if isinstance(frame_slots, FrameSlot):
+            frame_slots = {"main": frame_slots}
 
-        # Load employee profiles
-        self.employee_profiles = self.db_service.load_employee_encodings()
+        self.running = True
+        self.cameras = {camera_id: CameraRecognitionState(camera_id, frame_slot)
+                        for camera_id, frame_slot in frame_slots.items()}
+        self.camera = next(iter(self.cameras.values()))
+        self.frame_scheduler = FrameScheduler()
+        for camera_id, frame_slot in frame_slots.items():
+            self.frame_scheduler.add(camera_id, frame_slot)
+
+        # Map the gallery snapshot, or load employee profiles (one query, encodings decoded as a single matrix)
+        self._load_gallery()
+        self.employee_profiles = self.gallery.profiles  # Kept current by incremental updates
+
+        # Attendance is written by its own thread so slow commits never stall recognition
+        if self.app:
+            self.attendance_writer = AttendanceWriter(self.app, self.db_service)
+            self.attendance_writer.start()
+
+        # Apply enrolments, photo changes and deletions without a restart
+        if self.app:
+            self.gallery_sync = GallerySync(self.app, self.db_service, self.gallery,
+                                            on_change=self._gallery_changed)
+            self.gallery_sync.start()
+
+        # Build the approximate index in the background; exact search is used until it is ready
+        self._schedule_index_build()
 
         # Start processing thread
-        self.thread = Thread(target=self._detection_loop, daemon=True)
+        self.thread = Thread(target=self._detection_loop, name="face-detection", daemon=True)
         self.thread.start()
-        logger.info("Optimized face detection started")
+        logger.info(f"Optimized face detection started for {len(self.cameras)} camera(s)")
+
+    def _load_gallery(self):
+        """
+        Use the gallery snapshot when it was built from the current database version;
+        otherwise load from the database and write a fresh snapshot in the background.
+        """
+        if self.gallery_snapshot:
+            try:
+                arrays = self.gallery_snapshot.load(self.db_service.gallery_version())
+            except Exception as e:
+                logger.error(f"Failed to load gallery snapshot: {e}")
+                arrays = None
+            if arrays is not None:
+                self.gallery.load_arrays(*arrays, copy=False)  # Pages stay shared with other processes
+                return
+
+        self.gallery.load_arrays(*self.db_service.load_gallery_arrays())
+        self._schedule_snapshot_save()
+
+    def _gallery_changed(self):
+        self._schedule_index_build()
+        self._schedule_snapshot_save()
+
+    def _schedule_snapshot_save(self):
+        """
+        Rewrite the gallery snapshot in the background. Changes arriving during
+        a save trigger exactly one more save afterwards.
+        """
+        if not self.gallery_snapshot or not self.app:
+            return
+
+        with self.snapshot_lock:
+            if self.snapshot_saving:
+                self.snapshot_save_pending = True
+                return
+            self.snapshot_saving = True
+
+        Thread(target=self._snapshot_save_loop, name="gallery-snapshot", daemon=True).start()
+
+    def _snapshot_save_loop(self):
+        while True:
+            self._save_gallery_snapshot()
+            with self.snapshot_lock:
+                if not self.snapshot_save_pending:
+                    self.snapshot_saving = False
+                    return
+                self.snapshot_save_pending = False
+
+    def _save_gallery_snapshot(self):
+        try:
+            with self.app.app_context():
+                # Version first: rows changed during the load leave the snapshot stale, never wrong
+                version = self.db_service.gallery_version()
+                profiles, ids, encodings = self.db_service.load_gallery_arrays(raise_errors=True)
+            self.gallery_snapshot.save(version, profiles, ids, encodings)
+        except Exception as e:
+            logger.error(f"Failed to save gallery snapshot: {e}")
+
+    def _schedule_index_build(self):
+        """
+        (Re)build the ANN index in the background after the gallery changed.
+        Changes arriving during a build trigger exactly one more build afterwards.
+        """
+        if not self.use_ann_index or len(self.gallery) < self.ann_min_gallery_size:
+            return
+
+        with self.index_lock:
+            if self.index_building:
+                self.index_rebuild_pending = True
+                return
+            self.index_building = True
+
+        Thread(target=self._index_build_loop, name="gallery-index-build", daemon=True).start()
+
+    def _index_build_loop(self):
+        while True:
+            self._build_gallery_index()
+            with self.index_lock:
+                if not self.index_rebuild_pending:
+                    self.index_building = False
+                    return
+                self.index_rebuild_pending = False
+
+    def _build_gallery_index(self):
+        """Build the IVF index for the current gallery and log its recall against exact search"""
+        try:
+            index = IVFIndex(
+                nlist=self.ann_nlist,
+                nprobe=self.ann_nprobe,
+                min_gallery_size=self.ann_min_gallery_size
+            )
+            if not self.gallery.build_index(index):
+                return
+
+            # Use slightly perturbed gallery encodings as stand-in probes
+            rng = np.random.default_rng(0)
+            encodings = self.gallery.encodings.copy()
+            sample = encodings[rng.choice(len(encodings), min(200, len(encodings)), replace=False)]
+            probes = sample + rng.normal(0, 0.02, sample.shape).astype(np.float32)
+            stats = index.measure_recall(encodings, probes, k=1)
+
+            logger.info(f"Built ANN index over {index.size} encodings in {index.build_time:.1f}s "
+                        f"(recall@1={stats['recall']:.3f}, {stats['ann_ms']:.2f}ms vs "
+                        f"{stats['exact_ms']:.2f}ms exact per probe)")
+        except Exception as e:
+            logger.error(f"Failed to build ANN index: {e}")
 
     def stop(self):
         self.running = False
+        if self.frame_scheduler:
+            self.frame_scheduler.wake()
         if self.thread:
             self.thread.join(timeout=2)
+        if self.gallery_sync:
+            self.gallery_sync.stop()
+        if self.attendance_writer:
+            self.attendance_writer.stop()
+        if self.embedding_pool:
+            self.embedding_pool.stop()
+            self.embedding_pool = None
         logger.info("Face detection stopped")
 
     def _detection_loop(self):
-        last_time = time.time()
+        last_times = {}  # Previous processing time per camera, for its FPS
 
         while self.running:
-            if self.frame_queue.empty():
-                time.sleep(0.01)
+            # Sleep until any camera captures a frame; cameras are served round-robin
+            item = self.frame_scheduler.get(timeout=1.0)
+            if item is None:
                 continue
 
-            # Get frame from queue
-            rgb_frame = self.frame_queue.get()
+            # The frame is a shared pooled buffer: read it in place and release it when done
+            camera_id, (frame_seq, captured_at, frame, motion) = item
+            self.camera = self.cameras[camera_id]
+            self.last_frame_seq = frame_seq
             self.frame_count += 1
 
-            # Skip frames for performance
-            if self.frame_count % self.frame_skip != 0:
-                continue
-
-            # Calculate FPS
-            current_time = time.time()
-            fps = 1 / (current_time - last_time) if (current_time - last_time) > 0 else 0
-            self.fps_values.append(fps)
-            if len(self.fps_values) > 30:
-                self.fps_values.pop(0)
-            last_time = current_time
+            try:
+                # Skip frames for performance
+                if self.frame_count % self.frame_skip != 0:
+                    continue
 
-            # Process frame
-            detected_faces = self._process_frame(rgb_frame)
+                # Calculate FPS
+                current_time = time.time()
+                last_time = last_times.get(camera_id, current_time)
+                fps = 1 / (current_time - last_time) if (current_time - last_time) > 0 else 0
+                self.fps_values.append(fps)
+                if len(self.fps_values) > 30:
+                    self.fps_values.pop(0)
+                last_times[camera_id] = current_time
+
+                # Process frame
+                detected_faces = self._process_frame(frame.array, motion=motion)
+                self.camera.processed_frames += 1
+                processing_time = time.time() - current_time
+                self.camera.processing_time_values.append(processing_time)
+                self.camera.stage_seconds['frame'].observe(processing_time)
+                if len(self.camera.processing_time_values) > 30:
+                    self.camera.processing_time_values.pop(0)
+            finally:
+                frame.release()
 
             # Update faces with lock
             with self.face_lock:
                 self.faces = detected_faces
 
-    def _process_frame(self, rgb_frame):
+            # End-to-end latency from capture to published result
+            frame_latency = time.time() - captured_at
+            self.frame_latency_values.append(frame_latency)
+            self.camera.lag_seconds.observe(frame_latency)
+            if len(self.frame_latency_values) > 30:
+                self.frame_latency_values.pop(0)
+
+    def _process_frame(self, rgb_frame, motion=None):
         """
-        Enhanced face processing with tracking and optimized recognition
+        Enhanced face processing with tracking and optimized recognition.
+        motion is the capture side's motion flag (None when not measured).
         """
         detected_faces = []
         h, w, _ = rgb_frame.shape
 
+        # Apply embeddings finished by the worker pool since the last frame
+        if self.embedding_pool:
+            self._collect_worker_embeddings()
+
+        # Show attendance results written since the last frame
+        if self.attendance_writer:
+            self._collect_attendance_results()
+
         # Update face trackers age and remove old ones
         faces_to_delete = []
         for face_id, tracker_data in self.face_trackers.items():
@@ -137,10 +426,29 @@ class OptimizedFaceService:
         for face_id in faces_to_delete:
             del self.face_trackers[face_id]
 
-        # Detect faces using MediaPipe (faster than HOG)
-        results = self.face_detection.process(rgb_frame)
-
-        if not results.detections:
+        # Empty scene and nothing moving: skip detection and embedding entirely
+        if self._motion_gated(motion):
+            self.camera.motion_skipped_frames += 1
+            return []
+
+        # Between full detections, advance trackers with their motion model instead
+        if not self._detection_due():
+            self.frames_since_detection += 1
+            self._predict_trackers(w, h)
+            self._update_landmarks(rgb_frame)
+            return self._prepare_output()
+
+        self.frames_since_detection = 0
+        self.camera.detection_frames += 1
+        self.camera.last_detection_time = time.time()
+
+        # Detect faces on a downscaled copy; boxes come back in full-resolution coordinates
+        detection_start = time.time()
+        current_face_bboxes, current_face_locations, current_face_scores, current_face_keypoints = \
+            self._detect_faces(rgb_frame)
+        self.camera.stage_seconds['detection'].observe(time.time() - detection_start)
+
+        if not current_face_bboxes:
             # If no faces detected but we have trackers, use the last known positions
             if self.face_trackers:
                 for face_id, tracker_data in self.face_trackers.items():
@@ -150,247 +458,531 @@ class OptimizedFaceService:
                             tracker_data['bbox'][1],
                             tracker_data['bbox'][2],
                             tracker_data['bbox'][3],
-                            tracker_data['label']
+                            tracker_data['label'],
+                            self._tracker_landmarks(tracker_data)
                         ))
             return detected_faces
 
-        # Process detected faces
-        current_face_locations = []
-        current_face_bboxes = []
+        # Faces needing a fresh embedding this frame
+        refresh_trackers = []  # (face_id, detection index) of trackers due for a new encoding
+        new_detections = list(range(len(current_face_bboxes)))  # Detections without a tracker
 
-        for detection in results.detections:
+        # Match current detections with existing trackers (one detection per tracker)
+        if self.face_trackers:
+            face_ids = list(self.face_trackers.keys())
+            matches, _, new_detections = match_detections(
+                [self.face_trackers[face_id]['bbox'] for face_id in face_ids],
+                current_face_bboxes,
+                min_iou=self.min_tracking_iou
+            )
+
+            # Update matched trackers
+            for tracker_idx, detection_idx in matches:
+                tracker_data = self.face_trackers[face_ids[tracker_idx]]
+                bbox = current_face_bboxes[detection_idx]
+                tracker_data['velocity'] = update_velocity(
+                    tracker_data['velocity'],
+                    tracker_data['detected_bbox'],
+                    bbox,
+                    self.frame_count - tracker_data['detected_frame']
+                )
+                tracker_data['bbox'] = bbox
+                tracker_data['detected_bbox'] = bbox
+                tracker_data['detected_frame'] = self.frame_count
+                tracker_data['track_confidence'] = 1.0
+                tracker_data['age'] = 0
+
+                # Only re-encode face if TTL expired and no embedding is already in flight
+                if tracker_data['encoding_age'] >= self.encoding_ttl:
+                    if not self._embedding_in_flight(tracker_data):
+                        refresh_trackers.append((face_ids[tracker_idx], detection_idx))
+                else:
+                    tracker_data['encoding_age'] += 1
+
+        # Create trackers for new detections; they are identified once their first encoding arrives
+        for idx in new_detections:
+            face_id = self.next_face_id
+            self.next_face_id += 1
+
+            self.face_trackers[face_id] = {
+                'bbox': current_face_bboxes[idx],
+                'encoding': None,
+                'encoding_age': self.encoding_ttl,
+                'age': 0,
+                'label': "Unknown",
+                'employee_id': None,
+                'confidence': 0,
+                'embedding_seq': 0,  # Sequence number of the latest embedding request
+                'applied_seq': 0,  # Sequence number of the latest embedding applied
+                'pending_since': None,  # Frame count when the in-flight request was submitted
+                'detected_bbox': current_face_bboxes[idx],  # Last detected (not predicted) position
+                'detected_frame': self.frame_count,
+                'velocity': (0.0, 0.0, 0.0, 0.0),  # Per-frame change of (x, y, w, h)
+                'track_confidence': 1.0,  # Decays on predicted frames, see _predict_trackers
+                'landmarks': None,  # Face mesh points relative to the box, as fractions of (w, h)
+                'landmarks_frame': None  # Frame count of the last face mesh run
+            }
+            refresh_trackers.append((face_id, idx))
+
+        # Defer embedding for low-quality faces; their trackers stay due and retry next frame
+        if self.enable_quality_gate:
+            refresh_trackers = [
+                (face_id, idx) for face_id, idx in refresh_trackers
+                if self.quality_gate.check(rgb_frame, current_face_bboxes[idx], current_face_keypoints[idx]) is None
+            ]
+
+        # Encode every face that needs an embedding in a single batch
+        if refresh_trackers:
+            face_ids = [face_id for face_id, _ in refresh_trackers]
+            face_locations = [current_face_locations[idx] for _, idx in refresh_trackers]
+
+            if self.embedding_workers > 0:
+                self._submit_worker_embeddings(rgb_frame, face_ids, face_locations)
+            else:
+                embedding_start = time.time()
+                encodings = self._encode_faces(rgb_frame, face_locations)
+                self.camera.stage_seconds['embedding'].observe(time.time() - embedding_start)
+                self._apply_embeddings(face_ids, encodings)
+
+        self._update_landmarks(rgb_frame)
+        return self._prepare_output()
+
+    def _detect_faces(self, rgb_frame):
+        """
+        Run MediaPipe detection on a copy downscaled to at most detection_max_width
+        pixels wide, so detection cost does not grow with camera resolution.
+        MediaPipe boxes are relative, so they map straight back onto the
+        full-resolution frame used for embedding.
+        Returns (bboxes, face_recognition locations, scores, relative keypoints),
+        with boxes and locations in full-resolution pixels.
+        """
+        h, w = rgb_frame.shape[:2]
+
+        detection_frame = rgb_frame
+        if self.detection_max_width and w > self.detection_max_width:
+            scale = self.detection_max_width / float(w)
+            detection_frame = cv2.resize(rgb_frame, (self.detection_max_width, max(1, int(h * scale))),
+                                         interpolation=cv2.INTER_AREA)
+
+        # Detect faces using MediaPipe (faster than HOG)
+        results = self.face_detection.process(detection_frame)
+
+        bboxes = []
+        locations = []
+        scores = []
+        keypoints = []
+        for detection in results.detections or []:
             bbox = detection.location_data.relative_bounding_box
             x = max(0, int(bbox.xmin * w))
             y = max(0, int(bbox.ymin * h))
             width = min(int(bbox.width * w), w - x)
             height = min(int(bbox.height * h), h - y)
+            if width <= 0 or height <= 0:
+                continue
 
             # Store both formats
-            current_face_locations.append((y, x + width, y + height, x))  # face_recognition format
-            current_face_bboxes.append((x, y, width, height))  # Our bbox format
+            bboxes.append((x, y, width, height))  # Our bbox format
+            locations.append((y, x + width, y + height, x))  # face_recognition format
+            scores.append(detection.score[0] if detection.score else 1.0)
+            keypoints.append([(kp.x, kp.y) for kp in detection.location_data.relative_keypoints])
+
+        return bboxes, locations, scores, keypoints
+
+    def _motion_gated(self, motion):
+        """Whether a frame can be skipped: no motion, no active trackers and no safety detection due"""
+        if not self.motion_gating or motion is not False or self.face_trackers:
+            return False
+        if self.idle_detection_interval is None:
+            return True
+        return time.time() - self.camera.last_detection_time < self.idle_detection_interval
+
+    def _detection_due(self):
+        """Whether this frame needs a full detection pass rather than tracker prediction"""
+        if self.detection_interval <= 1 or not self.face_trackers:
+            return True
+        if self.frames_since_detection + 1 >= self.detection_interval:
+            return True
+        return any(tracker_data['track_confidence'] < self.min_track_confidence
+                   for tracker_data in self.face_trackers.values())
+
+    def _predict_trackers(self, frame_width, frame_height):
+        """
+        Move every tracker along its constant-velocity estimate and decay its confidence.
+        The decay reaches min_track_confidence exactly at detection_interval frames, so only
+        a prediction that fails the sanity check forces detection before the interval is up.
+        """
+        decay = self.min_track_confidence ** (1.0 / max(1, self.detection_interval))
+        for tracker_data in self.face_trackers.values():
+            frames = self.frame_count - tracker_data['detected_frame']
+            if not prediction_plausible(tracker_data['detected_bbox'], tracker_data['velocity'], frames,
+                                        (frame_width, frame_height)):
+                tracker_data['track_confidence'] = 0.0
+                continue
 
-        # Match current detections with existing trackers
-        if self.face_trackers:
-            # Calculate IoU between current detections and existing trackers
-            matched_faces = {}
-            unmatched_detections = list(range(len(current_face_bboxes)))
+            tracker_data['bbox'] = predict_bbox(
+                tracker_data['detected_bbox'],
+                tracker_data['velocity'],
+                frames,
+                (frame_width, frame_height)
+            )
+            tracker_data['track_confidence'] *= decay
 
-            for face_id, tracker_data in self.face_trackers.items():
-                best_iou = 0.3  # Minimum IoU threshold
-                best_match = -1
+    def _update_landmarks(self, rgb_frame):
+        """
+        Refresh the face mesh of recognised trackers every landmark_interval frames.
+        Points are stored relative to the tracker box so they follow it between refreshes
+        and the render path only has to draw them.
+        """
+        if not self.show_landmarks:
+            return
 
-                for i, bbox in enumerate(current_face_bboxes):
-                    iou = self._calculate_iou(tracker_data['bbox'], bbox)
-                    if iou > best_iou:
-                        best_iou = iou
-                        best_match = i
+        frame_h, frame_w = rgb_frame.shape[:2]
+        margin = self.landmark_margin
 
-                if best_match >= 0:
-                    matched_faces[face_id] = best_match
-                    if best_match in unmatched_detections:
-                        unmatched_detections.remove(best_match)
+        for tracker_data in self.face_trackers.values():
+            if tracker_data['employee_id'] is None:
+                tracker_data['landmarks'] = None
+                continue
 
-            # Update matched trackers
-            for face_id, detection_idx in matched_faces.items():
-                self.face_trackers[face_id]['bbox'] = current_face_bboxes[detection_idx]
-                self.face_trackers[face_id]['age'] = 0
-
-                # Only re-encode face if TTL expired
-                if self.face_trackers[face_id]['encoding_age'] >= self.encoding_ttl:
-                    face_location = [current_face_locations[detection_idx]]
-                    encodings = face_recognition.face_encodings(
-                        rgb_frame,
-                        face_location,
-                        num_jitters=self.jitter_count,
-                        model="small" if self.use_small_model else "large"
-                    )
-
-                    if encodings:
-                        self.face_trackers[face_id]['encoding'] = encodings[0]
-                        self.face_trackers[face_id]['encoding_age'] = 0
-
-                        # Re-identify face
-                        self._identify_face(face_id, encodings[0])
-                else:
-                    self.face_trackers[face_id]['encoding_age'] += 1
-
-            # Create new trackers for unmatched detections
-            for idx in unmatched_detections:
-                face_location = [current_face_locations[idx]]
-                encodings = face_recognition.face_encodings(
-                    rgb_frame,
-                    face_location,
-                    num_jitters=self.jitter_count,
-                    model="small" if self.use_small_model else "large"
-                )
+            landmarks_frame = tracker_data['landmarks_frame']
+            if landmarks_frame is not None and self.frame_count - landmarks_frame < self.landmark_interval:
+                continue
+            tracker_data['landmarks_frame'] = self.frame_count
 
-                if encodings:
-                    face_id = self.next_face_id
-                    self.next_face_id += 1
-
-                    # Create new tracker
-                    self.face_trackers[face_id] = {
-                        'bbox': current_face_bboxes[idx],
-                        'encoding': encodings[0],
-                        'encoding_age': 0,
-                        'age': 0,
-                        'label': "Unknown",
-                        'employee_id': None,
-                        'confidence': 0
-                    }
-
-                    # Identify the face
-                    self._identify_face(face_id, encodings[0])
-        else:
-            # No existing trackers, create new ones for all detections
-            face_encodings = face_recognition.face_encodings(
-                rgb_frame,
-                current_face_locations,
-                num_jitters=self.jitter_count,
-                model="small" if self.use_small_model else "large"
-            )
+            # Crop to face region with margin
+            x, y, w, h = tracker_data['bbox']
+            x1 = max(0, x - margin)
+            y1 = max(0, y - margin)
+            x2 = min(frame_w, x + w + margin)
+            y2 = min(frame_h, y + h + margin)
+
+            face_rgb = rgb_frame[y1:y2, x1:x2]
+            if face_rgb.size == 0 or w <= 0 or h <= 0:
+                continue
+
+            mesh_start = time.time()
+            try:
+                results = self.face_mesh.process(face_rgb)
+            except Exception as e:
+                logger.error(f"Face mesh failed: {e}")
+                continue
+            finally:
+                self.camera.stage_seconds['landmarks'].observe(time.time() - mesh_start)
+
+            if not results.multi_face_landmarks:
+                tracker_data['landmarks'] = None
+                continue
 
-            for i, (face_location, face_encoding) in enumerate(zip(current_face_bboxes, face_encodings)):
-                face_id = self.next_face_id
-                self.next_face_id += 1
+            # Convert normalized crop coordinates to fractions of the face box
+            points = np.array([(landmark.x, landmark.y) for landmark in results.multi_face_landmarks[0].landmark],
+                              dtype=np.float32)
+            points[:, 0] = (points[:, 0] * face_rgb.shape[1] + x1 - x) / w
+            points[:, 1] = (points[:, 1] * face_rgb.shape[0] + y1 - y) / h
+            tracker_data['landmarks'] = points
 
-                # Create new tracker
-                self.face_trackers[face_id] = {
-                    'bbox': face_location,
-                    'encoding': face_encoding,
-                    'encoding_age': 0,
-                    'age': 0,
-                    'label': "Unknown",
-                    'employee_id': None,
-                    'confidence': 0
-                }
+    def _tracker_landmarks(self, tracker_data):
+        """Cached face mesh of a tracker in pixel coordinates of its current box, or None"""
+        points = tracker_data.get('landmarks')
+        if points is None:
+            return None
 
-                # Identify the face
-                self._identify_face(face_id, face_encoding)
+        x, y, w, h = tracker_data['bbox']
+        return (points * np.array([w, h], dtype=np.float32) + np.array([x, y], dtype=np.float32)).astype(np.int32)
+
+    def _prepare_output(self):
+        """
+        Build the face list for rendering and log attendance for recognised trackers
+        """
+        detected_faces = []
 
         # Prepare output with current trackers
         for face_id, tracker_data in self.face_trackers.items():
             x, y, w, h = tracker_data['bbox']
 
-            # Log attendance if recognized and cooldown period passed
-            if tracker_data['employee_id'] is not None:
+            # Queue attendance if recognized and cooldown period passed
+            if tracker_data['employee_id'] is not None and self.attendance_writer:
                 current_time = time.time()
                 last_time = self.last_attendance_time.get(tracker_data['employee_id'], 0)
 
                 if current_time - last_time > self.attendance_cooldown:
-                    self.last_attendance_time[tracker_data['employee_id']] = current_time
-
-                    # Use app context for database operations
-                    if self.app:
-                        try:
-                            with self.app.app_context():
-                                result = self.db_service.log_attendance(tracker_data['employee_id'])
-
-                                # Handle different attendance actions
-                                if isinstance(result, dict):
-                                    action = result.get('action', '')
-
-                                    if action == 'check-in':
-                                        logger.info(f"Checked IN employee ID {tracker_data['employee_id']}")
-                                        # Update label to show check-in status
-                                        tracker_data['label'] += " [IN]"
-                                    elif action == 'check-out':
-                                        logger.info(f"Checked OUT employee ID {tracker_data['employee_id']}")
-                                        # Update label to show check-out status
-                                        hours = result.get('hours', 0)
-                                        tracker_data['label'] += f" [OUT: {hours}h]"
-                                    elif action == 'update-checkin':
-                                        logger.info(f"Updated check-in time for employee ID {tracker_data['employee_id']}")
-                                        tracker_data['label'] += " [IN]"
-                                    elif action == 'additional-checkin':
-                                        logger.info(f"Additional check-in for employee ID {tracker_data['employee_id']}")
-                                        tracker_data['label'] += " [IN+]"
-                                    elif action == 'skip':
-                                        reason = result.get('reason', '')
-                                        if reason == 'already-checkout':
-                                            tracker_data['label'] += " [OUT]"
-                                        else:
-                                            tracker_data['label'] += " [IN]"
-                                else:
-                                    logger.info(f"Logged attendance for employee ID {tracker_data['employee_id']}")
-                        except Exception as e:
-                            logger.error(f"Failed to log attendance: {e}")
+                    # A full queue drops the event; the cooldown is left untouched so it is retried
+                    if self.attendance_writer.submit(tracker_data['employee_id'], tag=(self.camera.camera_id, face_id),
+                                                     camera_id=self.camera.camera_id):
+                        self.last_attendance_time[tracker_data['employee_id']] = current_time
 
             # Add to detected faces
-            detected_faces.append((x, y, w, h, tracker_data['label']))
+            detected_faces.append((x, y, w, h, tracker_data['label'], self._tracker_landmarks(tracker_data)))
 
         return detected_faces
 
-    def _identify_face(self, face_id, face_encoding):
+    def _collect_attendance_results(self):
         """
-        Identify a face by comparing with known employee profiles
+        Append the check-in/check-out status of finished attendance events to the
+        current camera's tracker labels. Results of other cameras wait for their next frame.
         """
-        best_match_confidence = 0
-        best_match_id = None
-        best_match_name = "Unknown"
-
-        # Compare with known employees
-        for employee in self.employee_profiles:
-            # Use distance for better matching
-            face_distances = face_recognition.face_distance([employee["encoding"]], face_encoding)
-            if len(face_distances) > 0:
-                current_confidence = 1 - face_distances[0]
+        for (camera_id, face_id), employee_id, result in self.attendance_writer.poll_results():
+            camera = self.cameras.get(camera_id)
+            if camera is not None:
+                camera.attendance_results.append((face_id, employee_id, result))
+
+        results, self.camera.attendance_results = self.camera.attendance_results, []
+        for face_id, employee_id, result in results:
+            tracker_data = self.face_trackers.get(face_id)
+
+            # Handle different attendance actions
+            if isinstance(result, dict):
+                action = result.get('action', '')
+                suffix = None
+
+                if action == 'check-in':
+                    logger.info(f"Checked IN employee ID {employee_id}")
+                    suffix = " [IN]"
+                elif action == 'check-out':
+                    logger.info(f"Checked OUT employee ID {employee_id}")
+                    hours = result.get('hours', 0)
+                    suffix = f" [OUT: {hours}h]"
+                elif action == 'update-checkin':
+                    logger.info(f"Updated check-in time for employee ID {employee_id}")
+                    suffix = " [IN]"
+                elif action == 'additional-checkin':
+                    logger.info(f"Additional check-in for employee ID {employee_id}")
+                    suffix = " [IN+]"
+                elif action == 'skip':
+                    reason = result.get('reason', '')
+                    suffix = " [OUT]" if reason == 'already-checkout' else " [IN]"
+                elif action == 'error':
+                    logger.error(f"Failed to log attendance: {result.get('reason', '')}")
+
+                # Only label the tracker if it still shows the same employee
+                if suffix and tracker_data and tracker_data['employee_id'] == employee_id:
+                    tracker_data['label'] += suffix
+            else:
+                logger.info(f"Logged attendance for employee ID {employee_id}")
 
-                if current_confidence > self.recognition_threshold and current_confidence > best_match_confidence:
-                    best_match_confidence = current_confidence
-                    best_match_id = employee["id"]
-                    best_match_name = employee["name"]
+    def _encode_faces(self, rgb_frame, face_locations):
+        """
+        Compute encodings for all given face locations in one face_recognition call.
+        Returns one entry per location (None where no encoding could be computed).
+        """
+        try:
+            encodings = face_recognition.face_encodings(
+                rgb_frame,
+                face_locations,
+                num_jitters=self.jitter_count,
+                model="small" if self.use_small_model else "large"
+            )
+        except Exception as e:
+            logger.error(f"Batch face encoding failed: {e}")
+            return [None] * len(face_locations)
 
-        # Update tracker with identification results
-        if best_match_id is not None:
-            confidence_text = f" ({int(best_match_confidence*100)}%)" if self.show_recognition_score else ""
-            self.face_trackers[face_id]['label'] = f"{best_match_name}{confidence_text}"
-            self.face_trackers[face_id]['employee_id'] = best_match_id
-            self.face_trackers[face_id]['confidence'] = best_match_confidence
-        else:
-            self.face_trackers[face_id]['label'] = "Unknown"
-            self.face_trackers[face_id]['employee_id'] = None
-            self.face_trackers[face_id]['confidence'] = 0
+        encodings = list(encodings)
+        return encodings + [None] * (len(face_locations) - len(encodings))
 
-    def _calculate_iou(self, bbox1, bbox2):
+    def _apply_embeddings(self, face_ids, encodings):
         """
-        Calculate Intersection over Union between two bounding boxes
+        Store fresh encodings on their trackers and identify them as one batch
         """
-        x1, y1, w1, h1 = bbox1
-        x2, y2, w2, h2 = bbox2
+        identify_ids = []
+        identify_encodings = []
+
+        for face_id, encoding in zip(face_ids, encodings):
+            tracker_data = self.face_trackers.get(face_id)
+            if tracker_data is None:
+                continue  # Tracker expired while its embedding was computed
+
+            if encoding is None:
+                # Faces that never produced an encoding are dropped; known faces retry later
+                if tracker_data['encoding'] is None:
+                    del self.face_trackers[face_id]
+                continue
 
-        # Calculate coordinates of intersection
-        x_left = max(x1, x2)
-        y_top = max(y1, y2)
-        x_right = min(x1 + w1, x2 + w2)
-        y_bottom = min(y1 + h1, y2 + h2)
+            tracker_data['encoding'] = encoding
+            tracker_data['encoding_age'] = 0
+            identify_ids.append(face_id)
+            identify_encodings.append(encoding)
 
-        # Check if there is an intersection
-        if x_right < x_left or y_bottom < y_top:
-            return 0.0
+        # Identify all new encodings against the gallery at once
+        self._identify_faces(identify_ids, identify_encodings)
 
-        # Calculate area of intersection
-        intersection_area = (x_right - x_left) * (y_bottom - y_top)
+    def _embedding_in_flight(self, tracker_data):
+        """Whether the tracker still waits on a worker result (lost results expire after max_tracking_age frames)"""
+        pending_since = tracker_data['pending_since']
+        return pending_since is not None and self.frame_count - pending_since <= self.max_tracking_age
 
-        # Calculate area of both bounding boxes
-        bbox1_area = w1 * h1
-        bbox2_area = w2 * h2
+    def _submit_worker_embeddings(self, rgb_frame, face_ids, face_locations):
+        """
+        Hand faces to the embedding worker pool. Each request carries a per-tracker
+        sequence number so results are applied in order.
+        """
+        if self.embedding_pool is None:
+            self.embedding_pool = EmbeddingWorkerPool(
+                num_workers=self.embedding_workers,
+                num_jitters=self.jitter_count,
+                model="small" if self.use_small_model else "large"
+            )
+            self.embedding_pool.start(max_frame_bytes=rgb_frame.nbytes)
+        elif rgb_frame.nbytes > self.embedding_pool.slot_size:
+            # Slots are sized by the first frame; a higher-resolution camera grows them once
+            logger.info(f"Camera {self.camera.camera_id} frames ({rgb_frame.nbytes} bytes) exceed the "
+                        f"embedding slots ({self.embedding_pool.slot_size} bytes); restarting workers with larger slots")
+            self.embedding_pool.resize(rgb_frame.nbytes)
+            # Results of the old slots are gone, so waiting trackers may resubmit right away
+            for camera in self.cameras.values():
+                for tracker_data in camera.face_trackers.values():
+                    tracker_data['pending_since'] = None
+
+        tags = []
+        for face_id in face_ids:
+            self.face_trackers[face_id]['embedding_seq'] += 1
+            tags.append((self.camera.camera_id, face_id, self.face_trackers[face_id]['embedding_seq']))
+
+        # If every slot is busy the trackers stay due and are resubmitted next frame
+        if self.embedding_pool.submit(rgb_frame, face_locations, tags) is not None:
+            for face_id in face_ids:
+                self.face_trackers[face_id]['pending_since'] = self.frame_count
+
+    def _collect_worker_embeddings(self):
+        """
+        Apply finished worker results of the current camera, ignoring any older than
+        what a tracker already shows. Results of other cameras wait for their next frame.
+        """
+        for tags, encodings, seconds in self.embedding_pool.poll():
+            # One job holds the faces of one camera's frame; its round trip is that camera's embedding time
+            submitting_camera = self.cameras.get(tags[0][0]) if tags else None
+            if submitting_camera is not None:
+                submitting_camera.stage_seconds['embedding'].observe(seconds)
+            for (camera_id, face_id, seq), encoding in zip(tags, encodings):
+                camera = self.cameras.get(camera_id)
+                if camera is not None:
+                    camera.embedding_results.append((face_id, seq, encoding))
+
+        results, self.camera.embedding_results = self.camera.embedding_results, []
+        face_ids = []
+        fresh_encodings = []
+
+        for face_id, seq, encoding in results:
+            tracker_data = self.face_trackers.get(face_id)
+            if tracker_data is None or seq <= tracker_data['applied_seq']:
+                continue
 
-        # Calculate IoU
-        iou = intersection_area / float(bbox1_area + bbox2_area - intersection_area)
+            tracker_data['applied_seq'] = seq
+            if seq == tracker_data['embedding_seq']:
+                tracker_data['pending_since'] = None
+
+            face_ids.append(face_id)
+            fresh_encodings.append(encoding)
+
+        self._apply_embeddings(face_ids, fresh_encodings)
+
+    def camera_stats(self):
+        """Per-camera recognition metrics"""
+        return {camera_id: camera.stats() for camera_id, camera in self.cameras.items()}
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        samples = []
+        for camera_id, camera in list(self.cameras.items()):
+            labels = {'camera': camera_id}
+            samples += [
+                ('recognition_processed_frames_total', 'counter', "Frames processed by recognition", labels,
+                 camera.processed_frames),
+                ('recognition_detection_frames_total', 'counter', "Frames that ran full face detection", labels,
+                 camera.detection_frames),
+                ('recognition_motion_skipped_frames_total', 'counter',
+                 "Motionless frames skipped while nothing was tracked", labels, camera.motion_skipped_frames),
+                ('recognition_tracked_faces', 'gauge', "Faces currently tracked", labels, len(camera.face_trackers))
+            ]
+
+        samples.append(('face_gallery_size', 'gauge', "Employees in the recognition gallery", {}, len(self.gallery)))
+
+        quality = self.quality_gate.stats()
+        samples.append(('face_quality_passed_total', 'counter', "Faces that passed the quality gate", {},
+                        quality['passed']))
+        for reason in (FaceQualityGate.REASON_SIZE, FaceQualityGate.REASON_POSE, FaceQualityGate.REASON_BLUR):
+            samples.append(('face_quality_skipped_total', 'counter', "Faces whose embedding the quality gate skipped",
+                            {'reason': reason}, quality['skip_reasons'].get(reason, 0)))
+        if self.embedding_pool:
+            stats = self.embedding_pool.stats()
+            samples += [
+                ('embedding_workers_alive', 'gauge', "Embedding worker processes running", {},
+                 stats['alive_workers']),
+                ('embedding_jobs_in_flight', 'gauge', "Embedding jobs waiting for a worker result", {},
+                 stats['in_flight']),
+                ('embedding_free_slots', 'gauge', "Shared memory frame slots available", {}, stats['free_slots']),
+                ('embedding_jobs_submitted_total', 'counter', "Embedding jobs sent to workers", {},
+                 stats['submitted_jobs']),
+                ('embedding_jobs_rejected_total', 'counter', "Embedding jobs rejected (no free slot or oversized frame)",
+                 {}, stats['rejected_jobs']),
+                ('embedding_jobs_failed_total', 'counter', "Embedding jobs that raised in a worker", {},
+                 stats['failed_jobs']),
+                ('embedding_jobs_lost_total', 'counter', "Embedding jobs lost to dead workers or timeouts", {},
+                 stats['lost_jobs']),
+                ('embedding_worker_restarts_total', 'counter', "Embedding worker processes restarted", {},
+                 stats['restarted_workers'])
+            ]
+
+        if self.attendance_writer:
+            stats = self.attendance_writer.stats()
+            samples += [
+                ('attendance_queue_depth', 'gauge', "Attendance events waiting to be written", {},
+                 stats['queue_depth']),
+                ('attendance_events_submitted_total', 'counter', "Attendance events queued", {},
+                 stats['submitted_events']),
+                ('attendance_events_dropped_total', 'counter', "Attendance events dropped on a full queue", {},
+                 stats['dropped_events']),
+                ('attendance_events_written_total', 'counter', "Attendance events written", {},
+                 stats['written_events']),
+                ('attendance_failed_batches_total', 'counter', "Attendance batches retried event by event", {},
+                 stats['failed_batches'])
+            ]
+        return samples
+
+    def _identify_faces(self, face_ids, face_encodings):
+        """
+        Identify faces by comparing their encodings with known employee profiles
+        """
+        if not face_ids:
+            return
+
+        # Compare every encoding with all known employees in a single vectorized call
+        matching_start = time.time()
+        matches = self.gallery.best_matches(face_encodings, self.recognition_threshold)
+        self.camera.stage_seconds['matching'].observe(time.time() - matching_start)
 
-        return iou
+        for face_id, (profile, confidence) in zip(face_ids, matches):
+            tracker_data = self.face_trackers[face_id]
 
-    def generate_frames(self, original_frame):
-        """Enhanced frame generation with improved visualization for office environment"""
+            # Update tracker with identification results
+            if profile is not None:
+                confidence_text = f" ({int(confidence*100)}%)" if self.show_recognition_score else ""
+                tracker_data['label'] = f"{profile['name']}{confidence_text}"
+                tracker_data['employee_id'] = profile["id"]
+                tracker_data['confidence'] = confidence
+            else:
+                tracker_data['label'] = "Unknown"
+                tracker_data['employee_id'] = None
+                tracker_data['confidence'] = 0
+
+    def generate_frames(self, original_frame, out=None, camera_id=None):
+        """
+        Enhanced frame generation with improved visualization for office environment.
+        Draws the faces of camera_id (default: the first camera) on out (a reusable
+        buffer of the same shape) when given, otherwise on a copy.
+        """
+        camera = self.cameras.get(camera_id) or next(iter(self.cameras.values()))
         with self.face_lock:
-            faces = self.faces.copy()
+            faces = camera.faces.copy()
+            fps_values = list(camera.fps_values)
 
-        # Create a copy for drawing
-        display_frame = original_frame.copy()
+        # Create a copy for drawing; the original frame is shared with other stages
+        if out is not None and out.shape == original_frame.shape:
+            display_frame = out
+            np.copyto(display_frame, original_frame)
+        else:
+            display_frame = original_frame.copy()
 
         # Draw faces and information with enhanced styling
-        for (x, y, w, h, label) in faces:
+        for (x, y, w, h, label, landmarks) in faces:
             # Determine color based on recognition
             if "Unknown" in label:
                 color = (0, 0, 255)  # Red for unknown (BGR format)
@@ -426,43 +1018,18 @@ class OptimizedFaceService:
                        (x + 5, label_y + 20),
                        cv2.FONT_HERSHEY_DUPLEX, 0.7, (255, 255, 255), 1)
 
-            # Draw facial landmarks if enabled and face is known
-            if self.show_landmarks and "Unknown" not in label:
-                # Convert to RGB for MediaPipe
-                rgb_frame = cv2.cvtColor(original_frame, cv2.COLOR_BGR2RGB)
-
-                # Crop to face region with margin
-                margin = 20
-                x1 = max(0, x - margin)
-                y1 = max(0, y - margin)
-                x2 = min(rgb_frame.shape[1], x + w + margin)
-                y2 = min(rgb_frame.shape[0], y + h + margin)
-
-                face_rgb = rgb_frame[y1:y2, x1:x2]
-
-                if face_rgb.size > 0:  # Check if crop is valid
-                    # Process with face mesh
-                    results = self.face_mesh.process(face_rgb)
-
-                    if results.multi_face_landmarks:
-                        for face_landmarks in results.multi_face_landmarks:
-                            # Draw landmarks on the original frame
-                            for landmark in face_landmarks.landmark:
-                                # Convert normalized coordinates to pixel coordinates
-                                lm_x = int(landmark.x * face_rgb.shape[1]) + x1
-                                lm_y = int(landmark.y * face_rgb.shape[0]) + y1
-
-                                # Draw small circles for landmarks
-                                cv2.circle(display_frame, (lm_x, lm_y), 1, (255, 255, 0), -1)
+            # Draw the cached facial landmarks computed by the recognition pipeline
+            if self.show_landmarks and landmarks is not None and "Unknown" not in label:
+                for lm_x, lm_y in landmarks.tolist():
+                    cv2.circle(display_frame, (lm_x, lm_y), 1, (255, 255, 0), -1)
 
         # Add system information overlay
-        if self.show_fps and self.fps_values:
-            avg_fps = sum(self.fps_values) / len(self.fps_values)
+        if self.show_fps and fps_values:
+            avg_fps = sum(fps_values) / len(fps_values)
 
-            # Create semi-transparent overlay for system info
-            info_overlay = display_frame.copy()
-            cv2.rectangle(info_overlay, (10, 10), (200, 90), (0, 0, 0), -1)
-            cv2.addWeighted(info_overlay, 0.6, display_frame, 0.4, 0, display_frame)
+            # Create semi-transparent overlay for system info (only the panel region is blended)
+            panel = display_frame[10:91, 10:201]
+            cv2.addWeighted(np.zeros_like(panel), 0.6, panel, 0.4, 0, dst=panel)
 
             # Add FPS counter
             cv2.putText(display_frame, f"FPS: {avg_fps:.1f}", (20, 30),
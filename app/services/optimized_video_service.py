@@ -2,28 +2,39 @@ import time
 import cv2
 import threading
 import numpy as np
-from queue import Queue
 from app import logger
+from app.services.frame_slot import FrameSlot
+from app.services.frame_pool import FramePool
+from app.services.image_enhancer import ImageEnhancer
+from app.services.metrics import registry
+from app.services.replay_source import ReplayCapture, is_replay_source
 
 class OptimizedVideoService:
-    _instance = None
-
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
-
-    def __init__(self, rtsp_url="http://192.168.1.20:4747/video", resolution=(1280, 720), fps=20):
-        if self._initialized:
-            return
-
-        self._initialized = True
+    """
+    Capture pipeline of one camera; run one instance per camera.
+    The source may also be a video file or a directory of frames, which is
+    replayed through the same pipeline (see ReplayCapture).
+    """
+
+    def __init__(self, rtsp_url="http://192.168.1.20:4747/video", resolution=(1280, 720), fps=20,
+                 camera_id="main", fallback_to_webcam=True, motion_detection=False,
+                 replay_realtime=True, replay_loop=True):
+        self.camera_id = camera_id  # Recorded with attendance events and used in /video_feed/<camera_id>
         self.cap = None
-        self.frame = None
+        self.frame = None  # Latest display frame (BGR); read-only, owned by frame_handle
+        self.frame_handle = None  # PooledFrame backing self.frame
         self.running = False
         self.lock = threading.Lock()
-        self.frame_queue = Queue(maxsize=20)  # Increased queue size for smoother processing
+        self.frame_ready = threading.Condition(self.lock)  # Notified whenever self.frame is replaced
+        self.frame_seq = 0  # Incremented for every published display frame
+
+        # Published frames live in pooled buffers and are shared, never copied, between stages
+        self.frame_pool = FramePool()
+        # Recognition always gets the newest RGB frame; skipped ones go straight back to the pool
+        self.frame_slot = FrameSlot(capacity=1, on_superseded=lambda frame: frame.release())
+        self.capture_buffer = None  # Reused by cap.read()
+        self.resize_buffer = None  # Reused when the camera resolution differs
+        self.frame_allocations = 0  # Pool allocations made for the last captured frame
         self.thread = None
         self.rtsp_url = rtsp_url
 
@@ -36,50 +47,82 @@ class OptimizedVideoService:
         self.connection_timeout = 10  # Seconds to wait for connection
         self.camera_options = [
             # Try different camera sources in order
-            {"source": self.rtsp_url, "type": "rtsp"},
-            {"source": 0, "type": "webcam"},  # Default webcam
-            {"source": 1, "type": "webcam"},  # External webcam
+            {"source": self.rtsp_url, "type": "webcam" if isinstance(self.rtsp_url, int) else
+             "replay" if is_replay_source(self.rtsp_url) else "rtsp"},
         ]
+        # Local webcams are only a fallback for single-camera setups; with several
+        # entrances each pipeline must stay on its own stream
+        if fallback_to_webcam:
+            self.camera_options += [
+                {"source": 0, "type": "webcam"},  # Default webcam
+                {"source": 1, "type": "webcam"},  # External webcam
+            ]
         self.current_camera_index = 0
 
+        # Replay sources (video file or frame directory)
+        self.replay_realtime = replay_realtime  # Pace at the source frame rate; False = as fast as possible
+        self.replay_loop = replay_loop  # Start over at the end; False = stop capturing after the last frame
+        self.replay_finished = threading.Event()  # Set once a non-looping replay has delivered every frame
+        self.source_timestamp = 0  # Deterministic time of the last replayed frame, in seconds
+
         # Performance metrics
         self.actual_fps = 0
-        self.dropped_frames = 0
+        self.dropped_frames = 0  # Frames superseded before recognition picked them up
         self.reconnect_count = 0
         self.last_frame_time = 0
         self.frame_times = []  # For calculating average processing time
 
+        # Prometheus metrics, exported at /metrics
+        stage_seconds = registry.histogram('capture_stage_seconds', "Time spent in each capture stage",
+                                           ('camera', 'stage'))
+        self.read_seconds = stage_seconds.labels(camera_id, 'read')
+        self.motion_seconds = stage_seconds.labels(camera_id, 'motion')
+        self.enhance_seconds = stage_seconds.labels(camera_id, 'enhance')
+        self.convert_seconds = stage_seconds.labels(camera_id, 'convert')
+        self.reconnects = registry.counter('camera_reconnects_total', "Camera reconnect attempts",
+                                           ('camera',)).labels(camera_id)
+
         # Advanced settings
-        self.enable_motion_detection = False
-        self.motion_threshold = 25
+        # Motion is measured on a small grayscale copy and sent along with each frame,
+        # so recognition can skip motionless frames when nobody is being tracked
+        self.enable_motion_detection = motion_detection
+        self.motion_threshold = 25  # Gray-level change of a pixel that counts as movement
+        self.motion_min_area = 0.002  # Fraction of changed pixels that counts as motion
+        self.motion_width = 160  # Width of the grayscale copy used for motion detection
         self.previous_frame = None
         self.motion_detected = False
+        self.motion_time = 0  # Seconds spent on the last motion check
         self.frame_skip = 1  # Process every frame for office environment
         self.frame_count = 0
 
         # Image enhancement settings
         self.enable_enhancement = True
-        self.brightness = 0  # -50 to 50
-        self.contrast = 10   # -50 to 50
-        self.saturation = 10  # -50 to 50
-        self.auto_white_balance = True
+        self.image_enhancer = ImageEnhancer(
+            brightness=0,  # -50 to 50
+            contrast=10,   # -50 to 50
+            saturation=10,  # -50 to 50
+            auto_white_balance=True,
+            wb_interval=10  # Frames between white balance gain updates
+        )
 
     def start(self):
         if self.running:
             return
 
         self.running = True
-        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread = threading.Thread(target=self._capture_loop, name=f"capture-{self.camera_id}", daemon=True)
         self.thread.start()
-        logger.info("Optimized video capture started")
+        logger.info(f"Optimized video capture started for camera {self.camera_id}")
 
     def stop(self):
         self.running = False
+        with self.frame_ready:
+            self.frame_ready.notify_all()
         if self.thread:
             self.thread.join(timeout=2)
         if self.cap and self.cap.isOpened():
             self.cap.release()
-        logger.info("Video capture stopped")
+        logger.info(f"Video capture stopped for camera {self.camera_id}")
 
     def _ensure_capture_open(self):
         """Enhanced camera connection with fallback options for office environments"""
@@ -87,13 +130,13 @@ class OptimizedVideoService:
         if self.cap and self.cap.isOpened():
             # Check if the camera is still responsive
             ret = self.cap.grab()  # Lightweight check
-            if ret:
+            if ret or getattr(self.cap, 'finished', False):  # A finished replay is not reopened
                 return True
             else:
                 # Camera is open but not responsive, release it
                 self.cap.release()
                 self.cap = None
-                logger.warning("Camera connection lost, will attempt to reconnect")
+                logger.warning(f"Camera {self.camera_id} connection lost, will attempt to reconnect")
 
         # Try each camera option in sequence
         start_index = self.current_camera_index
@@ -108,7 +151,11 @@ class OptimizedVideoService:
                 logger.info(f"Attempting to connect to camera: {source} (type: {source_type})")
 
                 # Create VideoCapture with appropriate source
-                self.cap = cv2.VideoCapture(source)
+                if source_type == "replay":
+                    self.cap = ReplayCapture(source, fps=self.target_fps, realtime=self.replay_realtime,
+                                             loop=self.replay_loop)
+                else:
+                    self.cap = cv2.VideoCapture(source)
 
                 # Set connection timeout for RTSP streams
                 if source_type == "rtsp":
@@ -136,6 +183,15 @@ class OptimizedVideoService:
                         self.cap = None
                         raise Exception("RTSP connection timeout")
 
+                # Recorded frames are not configured, and the first one must not be consumed by a test read
+                if source_type == "replay":
+                    if not self.cap.isOpened() or not self.cap.grab():
+                        raise Exception("Replay source has no readable frames")
+                    logger.info(f"Replaying {source} at {self.cap.fps:.1f} FPS "
+                                f"({'paced' if self.replay_realtime else 'unpaced'})")
+                    self.reconnect_count = 0
+                    return True
+
                 # Check if camera opened successfully
                 if self.cap.isOpened():
                     # Configure camera settings
@@ -177,16 +233,17 @@ class OptimizedVideoService:
                     tried_all = True
 
         # If we've tried all options and failed, log error and return False
-        logger.error("Failed to connect to any camera")
+        logger.error(f"Failed to connect to any source for camera {self.camera_id}")
         return False
 
     def _reconnect(self):
         """Attempt to reconnect to the camera"""
-        logger.warning("Reconnecting to camera...")
+        logger.warning(f"Reconnecting to camera {self.camera_id}...")
         if self.cap:
             self.cap.release()
         self.cap = None
         self.reconnect_count += 1
+        self.reconnects.inc()
         time.sleep(1)  # Wait before reconnecting
 
     def _capture_loop(self):
@@ -211,14 +268,26 @@ class OptimizedVideoService:
 
             retry_count = 0  # Reset retry count on successful connection
 
-            # Read frame with timing
+            # Read frame with timing (into the same buffer every time)
             start_time = time.time()
-            ret, new_frame = self.cap.read()
+            ret, new_frame = self.cap.read(self.capture_buffer)
 
             if not ret or new_frame is None:
-                logger.warning("Frame read failed")
+                if getattr(self.cap, 'finished', False):
+                    # A replay that does not loop ends instead of reconnecting
+                    logger.info(f"Replay finished on camera {self.camera_id} after {self.cap.index + 1} frames")
+                    self.running = False
+                    self.replay_finished.set()
+                    with self.frame_ready:
+                        self.frame_ready.notify_all()
+                    break
+                logger.warning(f"Frame read failed on camera {self.camera_id}")
+                self.capture_buffer = None
                 self._reconnect()
                 continue
+            self.capture_buffer = new_frame
+            if isinstance(self.cap, ReplayCapture):
+                self.source_timestamp = self.cap.timestamp()
 
             # Update FPS calculation
             frames_captured += 1
@@ -228,6 +297,7 @@ class OptimizedVideoService:
 
             # Track frame processing times for performance monitoring
             self.frame_times.append(frame_time)
+            self.read_seconds.observe(frame_time)
             if len(self.frame_times) > 30:
                 self.frame_times.pop(0)
 
@@ -243,198 +313,186 @@ class OptimizedVideoService:
 
             # Process frame
             try:
+                allocations = self.frame_pool.allocations
+
                 # Resize if needed for consistency
                 if new_frame.shape[1] != self.resolution[0] or new_frame.shape[0] != self.resolution[1]:
-                    new_frame = cv2.resize(new_frame, self.resolution, interpolation=cv2.INTER_AREA)
+                    self.resize_buffer = cv2.resize(new_frame, self.resolution, dst=self.resize_buffer,
+                                                    interpolation=cv2.INTER_AREA)
+                    new_frame = self.resize_buffer
 
-                # Apply image enhancements for better face recognition in office lighting
-                if self.enable_enhancement:
-                    enhanced_frame = self._enhance_image(new_frame)
-                else:
-                    enhanced_frame = new_frame
-
-                # Motion detection (optional)
+                # Motion detection (optional) on the raw frame, so enhancement changes don't count
+                motion = None
                 if self.enable_motion_detection:
-                    self.motion_detected = self._detect_motion(enhanced_frame)
+                    self.motion_detected = motion = self._detect_motion(new_frame)
+                    self.motion_seconds.observe(self.motion_time)
 
-                # Store frame with lock
-                with self.lock:
-                    self.frame = enhanced_frame.copy()
+                # Apply image enhancements for better face recognition in office lighting,
+                # writing the result straight into the pooled display buffer
+                display = self.frame_pool.acquire(new_frame.shape)
+                stage_start = time.time()
+                if self.enable_enhancement:
+                    self._enhance_image(new_frame, out=display.array)
+                else:
+                    np.copyto(display.array, new_frame)
+                enhanced_frame = display.array
 
                 # Convert to RGB for face recognition
-                rgb_frame = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2RGB)
-
-                # Add to queue if not full
-                if not self.frame_queue.full():
-                    self.frame_queue.put(rgb_frame)
-                else:
-                    self.dropped_frames += 1
+                rgb = self.frame_pool.acquire(enhanced_frame.shape)
+                convert_start = time.time()
+                cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2RGB, dst=rgb.array)
+                self.enhance_seconds.observe(convert_start - stage_start)
+                self.convert_seconds.observe(time.time() - convert_start)
+
+                # Publish the display frame and wake everyone waiting for it
+                with self.frame_ready:
+                    previous = self.frame_handle
+                    self.frame_handle = display
+                    self.frame = enhanced_frame
+                    self.frame_seq += 1
+                    self.frame_ready.notify_all()
+                if previous:
+                    previous.release()
+
+                # Hand over to recognition; an unprocessed older frame is replaced, never queued
+                self.frame_slot.put(rgb, timestamp=current_time, motion=motion)
+                self.frame_allocations = self.frame_pool.allocations - allocations
+                superseded = self.frame_slot.superseded_frames
+                if superseded != self.dropped_frames:
+                    self.dropped_frames = superseded
                     # If we're dropping too many frames, consider increasing skip rate
-                    if self.dropped_frames % 30 == 0:
-                        logger.warning(f"Dropped {self.dropped_frames} frames, consider adjusting performance settings")
+                    if self.dropped_frames % 300 == 0:
+                        logger.warning(f"Recognition skipped {self.dropped_frames} frames, consider adjusting performance settings")
 
             except Exception as e:
                 logger.error(f"Capture processing error: {e}")
                 import traceback
                 logger.error(traceback.format_exc())
 
-    def _enhance_image(self, frame):
-        """Apply image enhancements for better face recognition in office environments"""
+    def _enhance_image(self, frame, out=None):
+        """
+        Apply image enhancements for better face recognition in office environments.
+        The input is never modified; the result is written to out when given.
+        """
         try:
-            # Create a copy to avoid modifying the original
-            enhanced = frame.copy()
-
-            # Apply brightness and contrast adjustments
-            if self.brightness != 0 or self.contrast != 0:
-                # Convert to float for processing
-                enhanced = enhanced.astype(float)
-
-                # Apply brightness adjustment
-                if self.brightness != 0:
-                    enhanced += self.brightness
-
-                # Apply contrast adjustment
-                if self.contrast != 0:
-                    factor = (259 * (self.contrast + 255)) / (255 * (259 - self.contrast))
-                    enhanced = factor * (enhanced - 128) + 128
-
-                # Clip values to valid range and convert back to uint8
-                enhanced = np.clip(enhanced, 0, 255).astype(np.uint8)
-
-            # Apply color enhancement if needed
-            if self.saturation != 0:
-                # Convert to HSV for saturation adjustment
-                hsv = cv2.cvtColor(enhanced, cv2.COLOR_BGR2HSV).astype(float)
-
-                # Adjust saturation
-                hsv[:, :, 1] *= (1 + self.saturation / 100)
-                hsv[:, :, 1] = np.clip(hsv[:, :, 1], 0, 255)
-
-                # Convert back to BGR
-                enhanced = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR)
-
-            # Apply auto white balance if enabled
-            if self.auto_white_balance:
-                # Simple gray world white balance
-                b, g, r = cv2.split(enhanced)
-                b_avg, g_avg, r_avg = np.mean(b), np.mean(g), np.mean(r)
-
-                # Calculate the average of the three channels
-                k = (b_avg + g_avg + r_avg) / 3
-
-                # Scale the channels to balance them
-                b = cv2.addWeighted(b, k / b_avg if b_avg > 0 else 1, 0, 0, 0)
-                g = cv2.addWeighted(g, k / g_avg if g_avg > 0 else 1, 0, 0, 0)
-                r = cv2.addWeighted(r, k / r_avg if r_avg > 0 else 1, 0, 0, 0)
-
-                # Merge the channels back
-                enhanced = cv2.merge([b, g, r])
-
-            # Apply noise reduction for better face recognition
-            enhanced = cv2.GaussianBlur(enhanced, (3, 3), 0)
-
-            return enhanced
-
+            return self.image_enhancer.enhance(frame, out=out)
         except Exception as e:
             logger.error(f"Image enhancement error: {e}")
-            return frame  # Return original frame if enhancement fails
+            # Return original frame if enhancement fails
+            if out is None:
+                return frame
+            np.copyto(out, frame)
+            return out
+
+    def frame_stats(self):
+        """Frame pool usage; allocations_per_frame stays at 0 once the pipeline is warm"""
+        stats = self.frame_pool.stats()
+        stats['allocations_per_frame'] = self.frame_allocations
+        stats['superseded_frames'] = self.frame_slot.superseded_frames
+        stats['motion_detected'] = self.motion_detected
+        stats['motion_ms'] = self.motion_time * 1000
+        stats['source_timestamp'] = self.source_timestamp
+        return stats
+
+    def collect_metrics(self):
+        """Scrape-time samples for the metrics registry"""
+        labels = {'camera': self.camera_id}
+        slot = self.frame_slot.stats()
+        pool = self.frame_stats()
+        return [
+            ('camera_capture_fps', 'gauge', "Frames captured per second", labels, self.actual_fps),
+            ('camera_connected', 'gauge', "Whether the camera source is open", labels,
+             bool(self.cap is not None and self.cap.isOpened())),
+            ('camera_frames_published_total', 'counter', "Frames handed to recognition", labels,
+             slot['published_frames']),
+            ('camera_frames_superseded_total', 'counter', "Frames replaced before recognition took them", labels,
+             slot['superseded_frames']),
+            ('camera_frame_slot_depth', 'gauge', "Frames waiting for recognition", labels, slot['depth']),
+            ('camera_motion_detected', 'gauge', "Motion seen in the last captured frame", labels,
+             self.motion_detected),
+            ('frame_pool_buffers_in_use', 'gauge', "Pooled frame buffers currently referenced", labels,
+             pool['in_use']),
+            ('frame_pool_buffers_free', 'gauge', "Pooled frame buffers ready for reuse", labels, pool['free']),
+            ('frame_pool_acquired_total', 'counter', "Frame buffers handed out by the pool", labels,
+             pool['acquired']),
+            ('frame_pool_allocations_total', 'counter', "Frame buffers allocated by the pool", labels,
+             pool['allocations']),
+            ('frame_pool_last_frame_allocations', 'gauge', "Pool allocations made for the last captured frame",
+             labels, pool['allocations_per_frame'])
+        ]
 
     def _detect_motion(self, frame):
-        """Simple motion detection"""
-        # Convert to grayscale and blur
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        """Simple motion detection on a small blurred grayscale copy of the frame"""
+        start_time = time.time()
 
-        # Initialize previous frame if needed
-        if self.previous_frame is None:
+        # Downscale first, then convert to grayscale and blur
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.motion_width, max(1, int(h * self.motion_width / float(w)))),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        # Initialize previous frame if needed (the first frame counts as motion)
+        if self.previous_frame is None or self.previous_frame.shape != gray.shape:
             self.previous_frame = gray
-            return False
+            self.motion_time = time.time() - start_time
+            return True
 
         # Calculate absolute difference
         frame_delta = cv2.absdiff(self.previous_frame, gray)
-        thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
+        changed = cv2.countNonZero(cv2.threshold(frame_delta, self.motion_threshold, 255, cv2.THRESH_BINARY)[1])
 
         # Update previous frame
         self.previous_frame = gray
+        self.motion_time = time.time() - start_time
 
         # Check if motion detected
-        return np.sum(thresh) > self.motion_threshold
-
-    def generate_frames(self, face_service):
-        """Generate enhanced frames for streaming with improved visualization"""
-        error_count = 0
-        max_errors = 5
-        last_frame_time = time.time()
-
-        while self.running:
-            try:
-                # Calculate time since last frame
-                current_time = time.time()
-                frame_interval = current_time - last_frame_time
-
-                # Throttle frame rate if needed to prevent browser overload
-                if frame_interval < 1.0 / 30:  # Cap at 30 FPS for browser
-                    time.sleep(0.01)
-                    continue
-
-                # Get current frame with lock
-                with self.lock:
-                    if self.frame is None:
-                        time.sleep(0.01)
-                        continue
-                    frame_copy = self.frame.copy()
-
-                # Apply face recognition overlay with enhanced visualization
-                processed_frame = face_service.generate_frames(frame_copy)
-
-                # Add system status overlay
-                self._add_system_overlay(processed_frame)
-
-                # Update last frame time
-                last_frame_time = current_time
-
-                # Encode frame for streaming with optimized quality
-                # Use higher quality for office environment
-                encoding_params = [
-                    int(cv2.IMWRITE_JPEG_QUALITY), self.quality,
-                    int(cv2.IMWRITE_JPEG_OPTIMIZE), 1
-                ]
-
-                ret, buffer = cv2.imencode('.jpg', processed_frame, encoding_params)
-                if not ret:
-                    logger.warning("Frame encoding failed")
-                    continue
-
-                # Reset error count on successful frame
-                error_count = 0
-
-                # Yield frame for streaming
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-
-            except Exception as e:
-                error_count += 1
-                logger.error(f"Frame generation error: {e}")
-
-                if error_count > max_errors:
-                    logger.error(f"Too many errors ({error_count}), resetting video service")
-                    self._reconnect()
-                    error_count = 0
+        return changed > self.motion_min_area * gray.size
+
+    def wait_for_frame(self, last_seq, timeout=None):
+        """
+        Block until a frame newer than last_seq has been captured.
+        Returns (seq, PooledFrame) retained for the caller, who must release() it,
+        or (last_seq, None) if none arrived within timeout.
+        """
+        with self.frame_ready:
+            if not self.frame_ready.wait_for(lambda: self.frame_seq != last_seq and self.frame_handle is not None,
+                                             timeout=timeout):
+                return last_seq, None
+            return self.frame_seq, self.frame_handle.retain()
+
+    def render_frame(self, frame, face_service, out=None):
+        """
+        Draw the face recognition and system overlays for a captured frame.
+        The captured frame is shared and never modified; drawing happens in out
+        (reused between calls when given) or in a new array.
+        """
+        processed_frame = face_service.generate_frames(frame, out=out, camera_id=self.camera_id)
+        self._add_system_overlay(processed_frame)
+        return processed_frame
+
+    def encode_jpeg(self, frame):
+        """Encode a frame for streaming; returns the JPEG bytes or None on failure"""
+        # Use higher quality for office environment
+        encoding_params = [
+            int(cv2.IMWRITE_JPEG_QUALITY), self.quality,
+            int(cv2.IMWRITE_JPEG_OPTIMIZE), 1
+        ]
 
-                time.sleep(0.1)  # Prevent tight loop on error
+        ret, buffer = cv2.imencode('.jpg', frame, encoding_params)
+        if not ret:
+            return None
+        return buffer.tobytes()
 
     def _add_system_overlay(self, frame):
         """Add system status overlay to frame"""
         # Calculate average processing time
         avg_processing_time = sum(self.frame_times) / len(self.frame_times) if self.frame_times else 0
 
-        # Create semi-transparent overlay for system info
+        # Create semi-transparent overlay for system info (only the panel region is blended)
         h, w = frame.shape[:2]
-        overlay = frame.copy()
-
-        # Draw background for system info
-        cv2.rectangle(overlay, (w-220, 10), (w-10, 120), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame, dst=frame[10:120, w-220:w-10])
+        panel = frame[10:120, w-220:w-10]
+        cv2.addWeighted(np.zeros_like(panel), 0.7, panel, 0.3, 0, dst=panel)
 
         # Add system information
         cv2.putText(frame, f"FPS: {self.actual_fps:.1f}", (w-210, 30),
@@ -0,0 +1,146 @@
+import glob
+import os
+import time
+import cv2
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def is_replay_source(source):
+    """Whether a camera source is a video file or a directory of frames rather than a stream or webcam"""
+    return isinstance(source, str) and "://" not in source and (os.path.isfile(source) or os.path.isdir(source))
+
+
+class ReplayCapture:
+    """
+    cv2.VideoCapture stand-in that replays a video file or a directory of
+    JPEG/PNG frames (sorted by name), so the whole capture -> recognition ->
+    attendance pipeline runs without a camera.
+
+    Frames are paced at the source frame rate when realtime is set, or
+    delivered as fast as they are read otherwise. Frame timestamps are
+    deterministic: frame n is stamped n / fps seconds, and keeps counting
+    across loops, so two runs over the same source see the same timeline.
+    grab() only loads the next frame and a following read() returns it, so a
+    liveness check with grab() never skips frames. With loop off, reads fail
+    after the last frame and `finished` is set.
+    """
+
+    def __init__(self, source, fps=None, realtime=True, loop=False):
+        self.source = source
+        self.realtime = realtime  # Pace frames at fps instead of delivering them as fast as possible
+        self.loop = loop  # Restart from the first frame at the end instead of finishing
+
+        self.paths = None  # Frame images when replaying a directory
+        self.video = None
+        if os.path.isdir(source):
+            self.paths = sorted(path for path in glob.glob(os.path.join(source, '*'))
+                                if path.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            self.video = cv2.VideoCapture(source)
+
+        source_fps = self.video.get(cv2.CAP_PROP_FPS) if self.video is not None else 0
+        self.fps = source_fps if source_fps and source_fps > 0 else (fps or 20)
+
+        self.index = -1  # Number of the last retrieved frame, counted across loops
+        self.file_index = 0  # Next image of the directory
+        self.pending = None  # Frame loaded by grab() and not yet retrieved
+        self.start_time = None  # Wall clock time of frame 0 when pacing
+        self.finished = False
+        self.loops = 0
+
+    def isOpened(self):
+        if self.paths is not None:
+            return bool(self.paths)
+        return self.video is not None and self.video.isOpened()
+
+    def grab(self):
+        """Load the next frame; it is returned by the next read()"""
+        if self.pending is None:
+            self.pending = self._next_frame()
+        return self.pending is not None
+
+    def retrieve(self, image=None):
+        """Return the grabbed frame; decoded frames are fresh arrays, so image is not used"""
+        frame, self.pending = self.pending, None
+        if frame is None:
+            return False, None
+
+        self.index += 1
+        if self.realtime:
+            # Hold the frame back until its slot on the source timeline
+            if self.start_time is None:
+                self.start_time = time.time()
+            delay = self.start_time + self.timestamp() - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        return True, frame
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def timestamp(self):
+        """Deterministic time of the last retrieved frame in seconds since the first frame"""
+        return max(self.index, 0) / self.fps
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.index + 1
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.timestamp() * 1000
+        if self.video is not None:
+            return self.video.get(prop)
+        if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT) and self.paths:
+            frame = cv2.imread(self.paths[0])
+            if frame is not None:
+                return frame.shape[1] if prop == cv2.CAP_PROP_FRAME_WIDTH else frame.shape[0]
+        if prop == cv2.CAP_PROP_FRAME_COUNT and self.paths is not None:
+            return len(self.paths)
+        return 0
+
+    def set(self, prop, value):
+        """Capture settings do not apply to recorded frames"""
+        return False
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+        self.pending = None
+
+    def _next_frame(self):
+        if self.finished:
+            return None
+
+        frame = self._read_source()
+        if frame is None and self.loop and self.index >= 0:
+            self._rewind()
+            frame = self._read_source()
+
+        if frame is None:
+            self.finished = True
+        return frame
+
+    def _read_source(self):
+        if self.paths is not None:
+            while self.file_index < len(self.paths):
+                path = self.paths[self.file_index]
+                self.file_index += 1
+                frame = cv2.imread(path)
+                if frame is not None:
+                    return frame
+            return None
+
+        ret, frame = self.video.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        self.loops += 1
+        if self.paths is not None:
+            self.file_index = 0
+        else:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from app import logger
+
+
+class SamplingProfiler:
+    """
+    Time-boxed sampling profiler for every thread of the running process.
+
+    A background thread reads sys._current_frames() every `interval` seconds
+    and counts each thread's call stack, so the capture, detection, stream and
+    waitress threads are profiled without a debugger or restart. Results come
+    out in the collapsed-stack format ("thread;outer;...;inner count") read by
+    flamegraph.pl, speedscope and similar tools.
+
+    Overhead is bounded: when taking samples costs more than `max_overhead`
+    of the wall time, the interval is stretched to stay within that budget.
+    A run stops by itself after its duration (at most max_duration), and the
+    number of distinct stacks kept is capped at max_stacks.
+    """
+
+    def __init__(self, interval=0.01, max_duration=120, max_overhead=0.02, max_stacks=20000):
+        self.interval = interval  # Default seconds between samples
+        self.max_duration = max_duration  # Upper bound on any requested duration, in seconds
+        self.max_overhead = max_overhead  # Fraction of wall time sampling may use
+        self.max_stacks = max_stacks  # Distinct stacks kept; further new stacks count as "[truncated]"
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.sample_time = 0  # CPU seconds spent taking samples
+        self.started_at = None
+        self.stopped_at = None
+        self.duration = 0
+        self.requested_interval = interval
+        self.current_interval = interval
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration=30, interval=None):
+        """
+        Start a new profile run, discarding the previous result.
+        Returns False if a run is already in progress.
+        """
+        with self.lock:
+            if self.running:
+                return False
+
+            self.duration = max(0.1, min(float(duration), self.max_duration))
+            self.requested_interval = max(0.001, float(interval or self.interval))
+            self.current_interval = self.requested_interval
+            self.stacks = Counter()
+            self.samples = 0
+            self.sample_time = 0
+            self.started_at = time.time()
+            self.stopped_at = None
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+            self.thread.start()
+
+        logger.info(f"Sampling profiler started for {self.duration:.0f}s "
+                    f"at {self.current_interval * 1000:.0f} ms intervals")
+        return True
+
+    def stop(self, timeout=2):
+        """Stop the current run early; its samples stay available"""
+        self.stop_event.set()
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+
+    def status(self):
+        with self.lock:
+            end = self.stopped_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0
+            return {
+                'running': self.running,
+                'started_at': self.started_at,
+                'duration': self.duration,
+                'elapsed': elapsed,
+                'samples': self.samples,
+                'stacks': len(self.stacks),
+                'interval_ms': self.current_interval * 1000,
+                'overhead': self.sample_time / elapsed if elapsed else 0
+            }
+
+    def collapsed(self):
+        """Profile in collapsed-stack format, one "frame;frame;... count" line per stack"""
+        with self.lock:
+            stacks = self.stacks.most_common()
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _sample_loop(self):
+        deadline = self.started_at + self.duration
+        own_ident = threading.get_ident()
+
+        while not self.stop_event.is_set() and time.time() < deadline:
+            # CPU time of this thread, so time spent waiting for the GIL is not counted as overhead
+            sample_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            self._take_sample(own_ident)
+            cost = time.thread_time() - cpu_start
+
+            with self.lock:
+                self.samples += 1
+                self.sample_time += cost
+                # Stay within the overhead budget by sampling less often when samples are expensive
+                average_cost = self.sample_time / self.samples
+                self.current_interval = max(self.requested_interval, average_cost / self.max_overhead)
+                interval = self.current_interval
+
+            self.stop_event.wait(max(0, interval - (time.perf_counter() - sample_start)))
+
+        with self.lock:
+            self.stopped_at = time.time()
+        logger.info(f"Sampling profiler stopped after {self.samples} samples")
+
+    def _take_sample(self, own_ident):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stacks.append(';'.join([names.get(ident, f"thread-{ident}")] + self._frame_names(frame)))
+
+        with self.lock:
+            for stack in stacks:
+                if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                    stack = '[truncated]'
+                self.stacks[stack] += 1
+
+    @staticmethod
+    def _frame_names(frame):
+        """Function names of a stack, outermost first"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.reverse()
+        return names
@@ -0,0 +1,223 @@
+import time
+import itertools
+import threading
+from app import logger
+from app.services.metrics import registry
+
+# Per-session viewer histograms: frames, skipped frames and seconds per connection
+SESSION_FRAME_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+SESSION_DROPPED_BUCKETS = (0, 1, 10, 100, 1000, 10000)
+SESSION_SECONDS_BUCKETS = (1, 10, 60, 300, 1800, 3600, 14400, 86400)
+
+
+class MJPEGBroadcastHub:
+    """
+    Renders and JPEG-encodes each camera frame once for every /video_feed viewer.
+
+    A single render thread draws the face and system overlays on the newest
+    captured frame, encodes it and publishes the multipart chunk. Each client
+    generator waits for a newer chunk than the one it last sent and always jumps
+    to the latest, so a slow client silently skips frames on its own without
+    holding back the render thread or other viewers. Rendering pauses while no
+    client is connected, and the render thread sleeps until the camera
+    publishes a new frame instead of polling.
+    """
+
+    def __init__(self, video_service, face_service, max_fps=30, client_timeout=5.0):
+        self.video_service = video_service
+        self.face_service = face_service
+        self.max_fps = max_fps  # Cap on rendered frames per second for browsers
+        self.client_timeout = client_timeout  # Seconds a client waits for a frame before rechecking
+
+        self.condition = threading.Condition()
+        self.chunk = None  # Latest encoded multipart chunk shared by all clients
+        self.seq = 0  # Incremented for every published chunk
+        self.clients = 0
+        self.render_buffer = None  # Reused for drawing overlays on every rendered frame
+        self.thread = None
+        self.running = False
+
+        # Metrics
+        self.encoded_frames = 0
+        self.client_dropped_frames = 0  # Frames skipped by clients that fell behind
+        self.total_clients = 0
+        self.last_render_time = 0
+        self.viewers = {}  # Viewer id -> {'connected_at', 'sent_frames', 'dropped_frames', 'last_seq'}
+        self.viewer_ids = itertools.count(1)
+
+        # Prometheus metrics, exported at /metrics
+        camera_id = video_service.camera_id
+        stage_seconds = registry.histogram('stream_stage_seconds', "Time spent rendering and encoding stream frames",
+                                           ('camera', 'stage'))
+        self.render_seconds = stage_seconds.labels(camera_id, 'render')
+        self.encode_seconds = stage_seconds.labels(camera_id, 'encode')
+
+        # Viewers are aggregated per camera when they disconnect; viewer ids never become labels
+        self.session_sent_frames = registry.histogram(
+            'stream_viewer_session_sent_frames', "Frames sent per viewer connection", ('camera',),
+            SESSION_FRAME_BUCKETS).labels(camera_id)
+        self.session_dropped_frames = registry.histogram(
+            'stream_viewer_session_dropped_frames', "Frames skipped per viewer connection", ('camera',),
+            SESSION_DROPPED_BUCKETS).labels(camera_id)
+        self.session_seconds = registry.histogram(
+            'stream_viewer_session_seconds', "Duration of viewer connections", ('camera',),
+            SESSION_SECONDS_BUCKETS).labels(camera_id)
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self._render_loop, name=f"stream-{self.video_service.camera_id}",
+                                       daemon=True)
+        self.thread.start()
+        logger.info("MJPEG broadcast hub started")
+
+    def stop(self):
+        if not self.running:
+            return
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=2)
+        logger.info(f"MJPEG broadcast hub stopped ({self.encoded_frames} frames encoded)")
+
+    def stream(self):
+        """Multipart generator for one client; every client shares the same encoded bytes"""
+        with self.condition:
+            self.clients += 1
+            self.total_clients += 1
+            viewer_id = next(self.viewer_ids)
+            viewer = {'connected_at': time.time(), 'sent_frames': 0, 'dropped_frames': 0, 'last_seq': self.seq}
+            self.viewers[viewer_id] = viewer
+            self.condition.notify_all()  # Wake the render thread if it was idle
+
+        last_seq = self.seq
+        try:
+            while self.running:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.seq != last_seq or not self.running,
+                                            timeout=self.client_timeout)
+                    if not self.running or self.seq == last_seq:
+                        continue
+
+                    # Frames published while this client was still sending are skipped
+                    if last_seq and self.seq - last_seq > 1:
+                        self.client_dropped_frames += self.seq - last_seq - 1
+                        viewer['dropped_frames'] += self.seq - last_seq - 1
+                    last_seq = self.seq
+                    viewer['last_seq'] = last_seq
+                    viewer['sent_frames'] += 1
+                    chunk = self.chunk
+
+                yield chunk
+        finally:
+            with self.condition:
+                self.clients -= 1
+                del self.viewers[viewer_id]
+            self.session_sent_frames.observe(viewer['sent_frames'])
+            self.session_dropped_frames.observe(viewer['dropped_frames'])
+            self.session_seconds.observe(time.time() - viewer['connected_at'])
+
+    def stats(self):
+        with self.condition:
+            return {
+                'clients': self.clients,
+                'total_clients': self.total_clients,
+                'encoded_frames': self.encoded_frames,
+                'client_dropped_frames': self.client_dropped_frames,
+                'last_render_ms': self.last_render_time * 1000,
+                'seq': self.seq,
+                'viewers': {viewer_id: dict(viewer) for viewer_id, viewer in self.viewers.items()}
+            }
+
+    def collect_metrics(self):
+        """
+        Scrape-time samples for the metrics registry. Connected viewers are summarised
+        per camera (the per-viewer breakdown is only in stats()), so label cardinality
+        stays bounded however many connections come and go.
+        """
+        labels = {'camera': self.video_service.camera_id}
+        stats = self.stats()
+        now = time.time()
+        viewers = list(stats['viewers'].values())
+        samples = [
+            ('stream_clients', 'gauge', "Connected MJPEG viewers", labels, stats['clients']),
+            ('stream_encoded_frames_total', 'counter', "Frames rendered and encoded for viewers", labels,
+             stats['encoded_frames']),
+            ('stream_client_dropped_frames_total', 'counter', "Frames skipped by viewers that fell behind", labels,
+             stats['client_dropped_frames']),
+            ('stream_viewer_max_lag_frames', 'gauge', "Most frames any connected viewer is behind the latest",
+             labels, max((stats['seq'] - viewer['last_seq'] for viewer in viewers), default=0)),
+            ('stream_viewer_max_connected_seconds', 'gauge', "Longest current viewer connection", labels,
+             max((now - viewer['connected_at'] for viewer in viewers), default=0))
+        ]
+        return samples
+
+    def _render_loop(self):
+        error_count = 0
+        max_errors = 5
+        last_frame_seq = 0
+        last_render = 0
+
+        while self.running:
+            with self.condition:
+                # Nobody is watching: don't spend CPU rendering
+                self.condition.wait_for(lambda: self.clients > 0 or not self.running)
+                if not self.running:
+                    break
+
+            # Throttle frame rate to prevent browser overload
+            wait = 1.0 / self.max_fps - (time.time() - last_render)
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                # Only render frames the camera has not delivered before
+                frame_seq, source = self.video_service.wait_for_frame(last_frame_seq, timeout=0.5)
+                if source is None:
+                    continue
+
+                start_time = time.time()
+                last_frame_seq = frame_seq
+                try:
+                    # Overlays are drawn into the hub's own buffer; the captured frame stays shared
+                    if self.render_buffer is None or self.render_buffer.shape != source.array.shape:
+                        self.render_buffer = source.array.copy()
+                    processed_frame = self.video_service.render_frame(source.array, self.face_service,
+                                                                      out=self.render_buffer)
+                finally:
+                    source.release()
+
+                encode_start = time.time()
+                self.render_seconds.observe(encode_start - start_time)
+                jpeg = self.video_service.encode_jpeg(processed_frame)
+                self.encode_seconds.observe(time.time() - encode_start)
+                if jpeg is None:
+                    logger.warning("Frame encoding failed")
+                    continue
+
+                chunk = (b'--frame\r\n'
+                         b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+                last_render = time.time()
+
+                with self.condition:
+                    self.chunk = chunk
+                    self.seq += 1
+                    self.encoded_frames += 1
+                    self.last_render_time = last_render - start_time
+                    self.condition.notify_all()
+
+                error_count = 0
+
+            except Exception as e:
+                error_count += 1
+                logger.error(f"Frame broadcast error: {e}")
+
+                if error_count > max_errors:
+                    logger.error(f"Too many errors ({error_count}), resetting video service")
+                    self.video_service._reconnect()
+                    error_count = 0
+
+                time.sleep(0.1)  # Prevent tight loop on error
@@ -0,0 +1,72 @@
+"""
+Benchmark face detection latency and recall when detecting on a downscaled copy
+of the frame (OptimizedFaceService.detection_max_width).
+
+Every input frame is first resized to each target camera resolution. Recall at
+each detection width is measured against detection on the full-resolution frame
+at that camera resolution (a box counts as found when IoU >= --min-iou).
+
+Usage: python -m benchmarks.bench_detection_scale --source clip.mp4
+       python -m benchmarks.bench_detection_scale --source frames_dir/ --widths 1280 640 320
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from app.services.optimized_face_service import OptimizedFaceService
+from app.services.face_tracker import match_detections
+from benchmarks.frames import load_frames
+
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', required=True, help="Video file or directory of JPEG/PNG frames")
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+',
+                        default=[(1280, 720), (1920, 1080), (3840, 2160)])
+    parser.add_argument('--widths', type=int, nargs='+', default=[1280, 960, 640, 480, 320],
+                        help="Detection widths to compare against full resolution")
+    parser.add_argument('--max-frames', type=int, default=200)
+    parser.add_argument('--min-iou', type=float, default=0.5)
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.max_frames)
+    if not frames:
+        raise SystemExit(f"No frames could be read from {args.source}")
+
+    service = OptimizedFaceService()
+    print(f"{len(frames)} frames from {args.source}")
+    print(f"{'camera':>10} {'detect width':>12} {'mean ms':>8} {'p95 ms':>8} {'recall':>7} {'faces':>6}")
+
+    for resolution in args.resolutions:
+        rgb_frames = [cv2.cvtColor(cv2.resize(f, resolution, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+                      for f in frames]
+
+        # Reference detections at full camera resolution
+        service.detection_max_width = None
+        reference = [service._detect_faces(f)[0] for f in rgb_frames]
+        total_faces = sum(len(boxes) for boxes in reference)
+
+        for width in [None] + [w for w in args.widths if w < resolution[0]]:
+            service.detection_max_width = width
+            latencies = []
+            found = 0
+
+            for rgb_frame, expected in zip(rgb_frames, reference):
+                start_time = time.perf_counter()
+                boxes = service._detect_faces(rgb_frame)[0]
+                latencies.append((time.perf_counter() - start_time) * 1000)
+                found += len(match_detections(expected, boxes, min_iou=args.min_iou)[0])
+
+            recall = found / total_faces if total_faces else 1.0
+            label = width or resolution[0]
+            print(f"{resolution[0]:>5}x{resolution[1]:<4} {label:>12} {np.mean(latencies):>8.2f} "
+                  f"{np.percentile(latencies, 95):>8.2f} {recall:>7.3f} {total_faces:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark frame enhancement: the original float64/float HSV/per-channel
+addWeighted path against the uint8 lookup-table ImageEnhancer.
+
+Output equivalence is checked with white balance measured on every frame
+(wb_interval=1); timings are also reported for the default interval. The run
+fails if any pixel differs by more than --tolerance.
+
+Usage: python -m benchmarks.bench_enhancement [--resolutions 1280x720 1920x1080] [--repeat 50]
+       python -m benchmarks.bench_enhancement --source clip.mp4
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from app.services.image_enhancer import ImageEnhancer
+from benchmarks.frames import load_frames, synthetic_frames
+
+
+def legacy_enhance(frame, brightness, contrast, saturation, auto_white_balance):
+    """Enhancement as computed by the original OptimizedVideoService._enhance_image"""
+    enhanced = frame.copy()
+
+    if brightness != 0 or contrast != 0:
+        enhanced = enhanced.astype(float)
+        if brightness != 0:
+            enhanced += brightness
+        if contrast != 0:
+            factor = (259 * (contrast + 255)) / (255 * (259 - contrast))
+            enhanced = factor * (enhanced - 128) + 128
+        enhanced = np.clip(enhanced, 0, 255).astype(np.uint8)
+
+    if saturation != 0:
+        hsv = cv2.cvtColor(enhanced, cv2.COLOR_BGR2HSV).astype(float)
+        hsv[:, :, 1] *= (1 + saturation / 100)
+        hsv[:, :, 1] = np.clip(hsv[:, :, 1], 0, 255)
+        enhanced = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR)
+
+    if auto_white_balance:
+        b, g, r = cv2.split(enhanced)
+        b_avg, g_avg, r_avg = np.mean(b), np.mean(g), np.mean(r)
+        k = (b_avg + g_avg + r_avg) / 3
+        b = cv2.addWeighted(b, k / b_avg if b_avg > 0 else 1, 0, 0, 0)
+        g = cv2.addWeighted(g, k / g_avg if g_avg > 0 else 1, 0, 0, 0)
+        r = cv2.addWeighted(r, k / r_avg if r_avg > 0 else 1, 0, 0, 0)
+        enhanced = cv2.merge([b, g, r])
+
+    return cv2.GaussianBlur(enhanced, (3, 3), 0)
+
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def time_frames(fn, frames, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(frames[i % len(frames)])
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', help="Video file or directory of JPEG/PNG frames (default: synthetic)")
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+', default=[(1280, 720), (1920, 1080)])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--brightness', type=int, default=0)
+    parser.add_argument('--contrast', type=int, default=10)
+    parser.add_argument('--saturation', type=int, default=10)
+    parser.add_argument('--no-white-balance', action='store_true')
+    parser.add_argument('--wb-interval', type=int, default=10)
+    parser.add_argument('--tolerance', type=int, default=2, help="Maximum allowed per-pixel difference")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    source_frames = load_frames(args.source, 20) if args.source else None
+    if args.source and not source_frames:
+        raise SystemExit(f"No frames could be read from {args.source}")
+
+    settings = dict(brightness=args.brightness, contrast=args.contrast, saturation=args.saturation,
+                    auto_white_balance=not args.no_white_balance)
+
+    print(f"{'resolution':>10} {'legacy ms':>10} {'lut ms':>8} {f'lut/{args.wb_interval} ms':>10} "
+          f"{'speedup':>8} {'max diff':>9} {'mean diff':>10} {'>1 px %':>8}")
+
+    failed = False
+    for resolution in args.resolutions:
+        if source_frames:
+            frames = [cv2.resize(f, resolution, interpolation=cv2.INTER_AREA) for f in source_frames]
+        else:
+            frames = synthetic_frames(resolution, 5, rng)
+
+        exact = ImageEnhancer(wb_interval=1, **settings)
+        cached = ImageEnhancer(wb_interval=args.wb_interval, **settings)
+        out = np.empty_like(frames[0])
+
+        # Output equivalence with gains measured on every frame
+        max_diff = 0
+        diffs = []
+        for frame in frames:
+            expected = legacy_enhance(frame, **settings)
+            diff = np.abs(exact.enhance(frame, out=out).astype(np.int16) - expected.astype(np.int16))
+            max_diff = max(max_diff, int(diff.max()))
+            diffs.append(diff)
+        diffs = np.stack(diffs)
+
+        legacy_ms = time_frames(lambda f: legacy_enhance(f, **settings), frames, args.repeat)
+        exact_ms = time_frames(lambda f: exact.enhance(f, out=out), frames, args.repeat)
+        cached_ms = time_frames(lambda f: cached.enhance(f, out=out), frames, args.repeat)
+
+        print(f"{resolution[0]:>5}x{resolution[1]:<4} {legacy_ms:>10.2f} {exact_ms:>8.2f} {cached_ms:>10.2f} "
+              f"{legacy_ms / cached_ms if cached_ms else 0:>7.1f}x {max_diff:>9} {diffs.mean():>10.4f} "
+              f"{(diffs > 1).mean() * 100:>8.3f}")
+        failed = failed or max_diff > args.tolerance
+
+    if failed:
+        raise SystemExit(f"Enhanced output differs from the legacy path by more than {args.tolerance}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark gallery loading at startup: the original path (ORM objects, one
+pickle.loads per employee, FaceGallery.load) against the float32 format
+(one row-tuple query, one np.frombuffer for all encodings,
+FaceGallery.from_arrays) and the memory-mapped gallery snapshot (version
+query, np.load(mmap_mode='r'), no copy). Also times the one-off migration of
+pickled rows.
+
+Runs against a temporary SQLite database filled with synthetic employees.
+
+Usage: python -m benchmarks.bench_gallery_load [--employees 1000 10000 50000] [--repeat 3]
+"""
+import argparse
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+from app import create_app, db
+from app.config import Config
+from app.models import Employee, migrate_face_encodings
+from app.services.db_service import DatabaseService
+from app.services.face_gallery import FaceGallery
+from app.services.gallery_snapshot import GallerySnapshot
+
+
+def legacy_load():
+    """Gallery load as done before the float32 format"""
+    profiles = []
+    for emp in Employee.query.all():
+        encoding = pickle.loads(emp.face_encoding)
+        if isinstance(encoding, np.ndarray) and encoding.shape[0] == 128:
+            profiles.append({"id": emp.id, "name": emp.name, "position": emp.position, "encoding": encoding,
+                             "email": emp.email, "phone": emp.phone, "updated_at": emp.updated_at})
+    return FaceGallery(profiles)
+
+
+def bulk_load(db_service):
+    return FaceGallery.from_arrays(*db_service.load_gallery_arrays())
+
+
+def snapshot_load(db_service, snapshot):
+    gallery = FaceGallery()
+    gallery.load_arrays(*snapshot.load(db_service.gallery_version()), copy=False)
+    return gallery
+
+
+def seed_pickled(count, rng):
+    """count employees with pickled float64 encodings, as written by older versions"""
+    db.session.query(Employee).delete()
+    db.session.commit()
+    encodings = rng.normal(0, 0.09, (count, 128))
+    now = datetime.now(timezone.utc)
+    db.session.execute(Employee.__table__.insert(), [
+        {'name': f"Employee {i}", 'face_encoding': pickle.dumps(encoding), 'position': '', 'email': '', 'phone': '',
+         'created_at': now, 'updated_at': now}
+        for i, encoding in enumerate(encodings)
+    ])
+    db.session.commit()
+
+
+def best_time(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start_time = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start_time)
+    return min(times) * 1000, result
+
+
+def blob_bytes():
+    sizes = [len(blob) for blob, in db.session.query(Employee.face_encoding).all()]
+    return sum(sizes) / len(sizes) if sizes else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger('app').setLevel(logging.WARNING)
+    rng = np.random.default_rng(args.seed)
+    workdir = tempfile.mkdtemp(prefix='bench_gallery_load_')
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    try:
+        app = create_app(BenchmarkConfig)
+        with app.app_context():
+            db_service = DatabaseService()
+            snapshot = GallerySnapshot(os.path.join(workdir, 'snapshot'))
+            print(f"{'employees':>9} {'pickle ms':>10} {'migrate ms':>11} {'float32 ms':>11} {'speedup':>8} "
+                  f"{'snapshot ms':>12} {'bytes before':>13} {'bytes after':>12} {'max diff':>9}")
+
+            for count in args.employees:
+                seed_pickled(count, rng)
+                bytes_before = blob_bytes()
+                legacy_ms, legacy = best_time(legacy_load, args.repeat)
+
+                start_time = time.perf_counter()
+                migrate_face_encodings()
+                migrate_ms = (time.perf_counter() - start_time) * 1000
+                bytes_after = blob_bytes()
+
+                bulk_ms, bulk = best_time(lambda: bulk_load(db_service), args.repeat)
+                snapshot.save(db_service.gallery_version(), *db_service.load_gallery_arrays())
+                snapshot_ms, mapped = best_time(lambda: snapshot_load(db_service, snapshot), args.repeat)
+                max_diff = float(max(np.abs(legacy.encodings - bulk.encodings).max(),
+                                     np.abs(legacy.encodings - mapped.encodings).max())) if count else 0
+
+                print(f"{count:>9} {legacy_ms:>10.1f} {migrate_ms:>11.1f} {bulk_ms:>11.1f} "
+                      f"{legacy_ms / bulk_ms if bulk_ms else 0:>7.1f}x {snapshot_ms:>12.1f} "
+                      f"{bytes_before:>13.0f} {bytes_after:>12.0f} {max_diff:>9.2g}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
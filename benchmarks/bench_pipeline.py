@@ -0,0 +1,345 @@
+"""
+End-to-end benchmark of the recognition pipeline, run headless from a recorded
+clip (or synthetic frames) and a synthetic employee gallery.
+
+Every stage is timed on its own and reported as throughput (calls per second)
+and p50/p95/p99 latency:
+
+  capture      JPEG decode of replayed frames (ReplayCapture)   per resolution
+  enhancement  ImageEnhancer                                    per resolution
+  detection    MediaPipe detection on the downscaled copy       per resolution
+  embedding    face_recognition encodings of N face boxes       per resolution and face count
+  matching     FaceGallery.best_matches for N probes            per gallery size and face count
+  attendance   DatabaseService.log_attendance, first check-ins and repeated sightings (SQLite)
+  rendering    face and info overlays for N faces               per resolution and face count
+  jpeg         stream JPEG encoding                             per resolution
+  pipeline     replay -> capture thread -> recognition thread, unpaced, largest gallery
+
+Embedding boxes are laid out on a grid, so they measure encoder cost whether
+or not the frames show real faces. The pipeline stage reports per-frame
+recognition time plus capture/recognition FPS and superseded frames.
+Everything runs against a temporary database; nothing touches the real one.
+
+Results are saved as JSON with --output; --baseline prints the p50 change of
+each measurement against an earlier results file.
+
+Usage: python -m benchmarks.bench_pipeline --output results.json
+       python -m benchmarks.bench_pipeline --source clip.mp4 --resolutions 1280x720 --gallery-sizes 1000 10000
+       python -m benchmarks.bench_pipeline --stages matching attendance --baseline results.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+import cv2
+import numpy as np
+from app import create_app, db
+from app.config import Config
+from app.models import Employee
+from app.services.db_service import DatabaseService
+from app.services.face_encoding import ENCODING_FORMAT_FLOAT32LE, encode_encoding
+from app.services.face_gallery import FaceGallery
+from app.services.image_enhancer import ImageEnhancer
+from app.services.optimized_face_service import OptimizedFaceService
+from app.services.optimized_video_service import OptimizedVideoService
+from app.services.replay_source import ReplayCapture
+from benchmarks.frames import load_frames, synthetic_frames, write_frames
+
+STAGES = ('capture', 'enhancement', 'detection', 'embedding', 'matching', 'attendance',
+          'rendering', 'jpeg', 'pipeline')
+
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def summarize(stage, latencies, **params):
+    """One result row: throughput and latency percentiles of a list of durations in seconds"""
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000
+    total = latencies.sum() / 1000
+    result = {'stage': stage, **params, 'count': int(len(latencies)),
+              'throughput': len(latencies) / total if total > 0 else 0}
+    if len(latencies):
+        result.update({
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'p99_ms': float(np.percentile(latencies, 99))
+        })
+    return result
+
+
+def timed(fn, items):
+    latencies = []
+    for item in items:
+        start_time = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start_time)
+    return latencies
+
+
+def resolution_label(resolution):
+    return f"{resolution[0]}x{resolution[1]}"
+
+
+def synthetic_encodings(count, rng):
+    """Random vectors with the spread of real 128-d face encodings"""
+    return rng.normal(0, 0.09, (count, 128)).astype(np.float64)
+
+
+def grid_locations(resolution, faces):
+    """face_recognition (top, right, bottom, left) boxes laid out on a grid"""
+    w, h = resolution
+    size = max(40, h // 6)
+    columns = max(1, w // size)
+    locations = []
+    for i in range(faces):
+        x = (i % columns) * size
+        y = ((i // columns) * size) % max(1, h - size)
+        locations.append((y, x + size, y + size, x))
+    return locations
+
+
+def seed_employees(count, rng):
+    """Replace the employees of the benchmark database with count synthetic ones"""
+    db.session.query(Employee).delete()
+    db.session.commit()
+    for i, encoding in enumerate(synthetic_encodings(count, rng)):
+        db.session.add(Employee(name=f"Employee {i}", face_encoding=encode_encoding(encoding),
+                                encoding_format=ENCODING_FORMAT_FLOAT32LE))
+    db.session.commit()
+
+
+def bench_capture(frames_dir, resolution):
+    capture = ReplayCapture(frames_dir, realtime=False)
+    latencies = []
+    while True:
+        start_time = time.perf_counter()
+        ret, _ = capture.read()
+        if not ret:
+            break
+        latencies.append(time.perf_counter() - start_time)
+    capture.release()
+    return [summarize('capture', latencies, resolution=resolution_label(resolution))]
+
+
+def bench_frames(stages, face_service, video_service, frames, rgb_frames, resolution, face_counts):
+    label = resolution_label(resolution)
+    results = []
+
+    if 'enhancement' in stages:
+        enhancer = ImageEnhancer()
+        out = np.empty_like(frames[0])
+        results.append(summarize('enhancement', timed(lambda f: enhancer.enhance(f, out=out), frames),
+                                 resolution=label))
+
+    if 'detection' in stages:
+        results.append(summarize('detection', timed(face_service._detect_faces, rgb_frames), resolution=label))
+
+    for faces in face_counts:
+        locations = grid_locations(resolution, faces)
+        if 'embedding' in stages:
+            latencies = timed(lambda f: face_service._encode_faces(f, locations), rgb_frames)
+            results.append(summarize('embedding', latencies, resolution=label, faces=faces))
+
+        if 'rendering' in stages:
+            face_service.camera.faces = [(left, top, right - left, bottom - top, f"Employee {i} (0.80)", None)
+                                         for i, (top, right, bottom, left) in enumerate(locations)]
+            render_buffer = np.empty_like(frames[0])
+            latencies = timed(lambda f: face_service.generate_frames(f, out=render_buffer), frames)
+            results.append(summarize('rendering', latencies, resolution=label, faces=faces))
+            face_service.camera.faces = []
+
+    if 'jpeg' in stages:
+        results.append(summarize('jpeg', timed(video_service.encode_jpeg, frames), resolution=label))
+    return results
+
+
+def bench_matching(gallery_sizes, face_counts, repeat, rng):
+    results = []
+    for gallery_size in gallery_sizes:
+        encodings = synthetic_encodings(gallery_size, rng)
+        gallery = FaceGallery([{"id": i + 1, "name": f"Employee {i}", "encoding": encoding}
+                               for i, encoding in enumerate(encodings)])
+        for faces in face_counts:
+            # Half of the probes are noisy copies of enrolled employees, the rest are strangers
+            known = encodings[rng.integers(0, gallery_size, faces)] + rng.normal(0, 0.02, (faces, 128))
+            probes = np.where(np.arange(faces)[:, None] % 2 == 0, known, synthetic_encodings(faces, rng))
+            latencies = timed(lambda _: gallery.best_matches(probes, 0.55), range(repeat))
+            results.append(summarize('matching', latencies, gallery_size=gallery_size, faces=faces))
+    return results
+
+
+def bench_attendance(events, rng):
+    seed_employees(events, rng)
+    db_service = DatabaseService()
+    employee_ids = [employee.id for employee in Employee.query.all()]
+
+    # First sighting inserts a check-in; repeated sightings hit the cooldown
+    first = timed(lambda employee_id: db_service.log_attendance(employee_id, camera_id='bench'), employee_ids)
+    repeat = timed(lambda employee_id: db_service.log_attendance(employee_id, camera_id='bench'), employee_ids)
+    return [summarize('attendance', first, event='check-in'),
+            summarize('attendance', repeat, event='repeat')]
+
+
+def bench_pipeline(app, frames_dir, resolution, gallery_size, timeout):
+    video_service = OptimizedVideoService(rtsp_url=frames_dir, resolution=resolution, camera_id='bench',
+                                          fallback_to_webcam=False, replay_realtime=False, replay_loop=False)
+    face_service = OptimizedFaceService(app=app)
+
+    # Time every recognition step without changing what the detection thread does
+    latencies = []
+    process_frame = face_service._process_frame
+
+    def timed_process_frame(rgb_frame, motion=None):
+        start_time = time.perf_counter()
+        try:
+            return process_frame(rgb_frame, motion=motion)
+        finally:
+            latencies.append(time.perf_counter() - start_time)
+
+    face_service._process_frame = timed_process_frame
+    face_service.start({'bench': video_service.frame_slot})
+    camera = face_service.cameras['bench']
+
+    start_time = time.perf_counter()
+    video_service.start()
+    video_service.replay_finished.wait(timeout)
+
+    # Let recognition finish the frames still in flight
+    slot = video_service.frame_slot
+    deadline = time.perf_counter() + timeout
+    while (not slot.empty() or camera.processed_frames < slot.consumed_frames) and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start_time
+
+    video_service.stop()
+    face_service.stop()
+
+    result = summarize('pipeline', latencies, resolution=resolution_label(resolution), gallery_size=gallery_size)
+    result.update({
+        'captured_frames': slot.published_frames,
+        'processed_frames': camera.processed_frames,
+        'superseded_frames': slot.superseded_frames,
+        'capture_fps': slot.published_frames / elapsed if elapsed > 0 else 0,
+        'recognition_fps': camera.processed_frames / elapsed if elapsed > 0 else 0,
+        'capture_to_result_ms': camera.stats()['latency_ms']
+    })
+    return [result]
+
+
+def result_key(result):
+    return tuple((name, result.get(name)) for name in ('stage', 'resolution', 'faces', 'gallery_size', 'event'))
+
+
+def describe(result):
+    return ' '.join(f"{value}" if name == 'resolution' else f"{name}={value}"
+                    for name, value in result_key(result)[1:] if value is not None)
+
+
+def print_results(results, baseline=None):
+    baseline = {result_key(r): r for r in baseline or []}
+    print(f"{'stage':<12} {'parameters':<28} {'count':>6} {'per s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9}" + (f" {'p50 vs base':>12}" if baseline else ''))
+    for result in results:
+        line = (f"{result['stage']:<12} {describe(result):<28} {result['count']:>6} {result['throughput']:>9.1f} "
+                f"{result.get('p50_ms', 0):>9.2f} {result.get('p95_ms', 0):>9.2f} {result.get('p99_ms', 0):>9.2f}")
+        previous = baseline.get(result_key(result))
+        if previous and previous.get('p50_ms'):
+            line += f" {(result.get('p50_ms', 0) / previous['p50_ms'] - 1) * 100:>+11.1f}%"
+        print(line)
+        if result['stage'] == 'pipeline':
+            print(f"{'':<12} capture {result['capture_fps']:.1f} FPS, recognition {result['recognition_fps']:.1f} FPS, "
+                  f"{result['superseded_frames']} of {result['captured_frames']} frames superseded, "
+                  f"capture-to-result {result['capture_to_result_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', help="Video file or directory of JPEG/PNG frames (default: synthetic)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+', default=[(1280, 720), (1920, 1080)])
+    parser.add_argument('--faces', type=int, nargs='+', default=[1, 5, 10], help="Faces per frame")
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--frames', type=int, default=30, help="Frames per resolution")
+    parser.add_argument('--repeat', type=int, default=200, help="Calls per matching measurement")
+    parser.add_argument('--attendance-events', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=120, help="Seconds allowed for one pipeline run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Earlier JSON results to compare p50 latencies against")
+    args = parser.parse_args()
+
+    # Per-event log lines would drown the report
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    source_frames = load_frames(args.source, args.frames) if args.source else None
+    if args.source and not source_frames:
+        raise SystemExit(f"No frames could be read from {args.source}")
+
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    results = []
+    try:
+        app = create_app(BenchmarkConfig)
+        with app.app_context():
+            face_service = OptimizedFaceService(app=app)
+
+            for resolution in args.resolutions:
+                if source_frames:
+                    frames = [cv2.resize(f, resolution, interpolation=cv2.INTER_AREA) for f in source_frames]
+                else:
+                    frames = synthetic_frames(resolution, args.frames, rng)
+                rgb_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+                frames_dir = write_frames(frames, os.path.join(workdir, resolution_label(resolution)))
+                video_service = OptimizedVideoService(rtsp_url=frames_dir, resolution=resolution,
+                                                      fallback_to_webcam=False)
+
+                if 'capture' in args.stages:
+                    results += bench_capture(frames_dir, resolution)
+                results += bench_frames(args.stages, face_service, video_service, frames, rgb_frames,
+                                        resolution, args.faces)
+                if 'pipeline' in args.stages:
+                    seed_employees(max(args.gallery_sizes), rng)
+                    results += bench_pipeline(app, frames_dir, resolution, max(args.gallery_sizes), args.timeout)
+
+            if 'matching' in args.stages:
+                results += bench_matching(args.gallery_sizes, args.faces, args.repeat, rng)
+            if 'attendance' in args.stages:
+                results += bench_attendance(args.attendance_events, rng)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'args': {name: value for name, value in vars(args).items() if name not in ('output', 'baseline')},
+            'results': results
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark tracker/detection association: the original nested-loop IoU matching
+against the vectorized IoU matrix with one-to-one assignment.
+
+Usage: python -m benchmarks.bench_tracker [--faces 5 10 25 50 100] [--repeat 200]
+"""
+import argparse
+import time
+import numpy as np
+from app.services.face_tracker import match_detections
+
+
+def legacy_iou(bbox1, bbox2):
+    """IoU as computed by the original OptimizedFaceService._calculate_iou"""
+    x1, y1, w1, h1 = bbox1
+    x2, y2, w2, h2 = bbox2
+    x_left = max(x1, x2)
+    y_top = max(y1, y2)
+    x_right = min(x1 + w1, x2 + w2)
+    y_bottom = min(y1 + h1, y2 + h2)
+    if x_right < x_left or y_bottom < y_top:
+        return 0.0
+    intersection_area = (x_right - x_left) * (y_bottom - y_top)
+    return intersection_area / float(w1 * h1 + w2 * h2 - intersection_area)
+
+
+def legacy_match(tracker_bboxes, detection_bboxes, min_iou=0.3):
+    """Original greedy per-tracker matching (a detection may be claimed twice)"""
+    matched = {}
+    for t, tracker_bbox in enumerate(tracker_bboxes):
+        best_iou = min_iou
+        best_match = -1
+        for i, bbox in enumerate(detection_bboxes):
+            iou = legacy_iou(tracker_bbox, bbox)
+            if iou > best_iou:
+                best_iou = iou
+                best_match = i
+        if best_match >= 0:
+            matched[t] = best_match
+    return matched
+
+
+def make_scene(num_faces, rng, frame_size=(1920, 1080)):
+    """Random face boxes plus slightly moved copies of them as the next frame's detections"""
+    sizes = rng.integers(40, 160, num_faces)
+    xs = rng.integers(0, frame_size[0] - 160, num_faces)
+    ys = rng.integers(0, frame_size[1] - 160, num_faces)
+    trackers = [(int(x), int(y), int(s), int(s)) for x, y, s in zip(xs, ys, sizes)]
+    jitter = rng.integers(-8, 9, (num_faces, 2))
+    detections = [(x + int(dx), y + int(dy), w, h) for (x, y, w, h), (dx, dy) in zip(trackers, jitter)]
+    order = rng.permutation(num_faces)
+    return trackers, [detections[i] for i in order]
+
+
+def time_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--faces', type=int, nargs='+', default=[5, 10, 25, 50, 100])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'faces':>6} {'legacy ms':>10} {'vectorized ms':>14} {'speedup':>8} {'double claims':>14}")
+
+    for num_faces in args.faces:
+        trackers, detections = make_scene(num_faces, rng)
+
+        legacy_ms = time_call(lambda: legacy_match(trackers, detections), args.repeat)
+        vector_ms = time_call(lambda: match_detections(trackers, detections), args.repeat)
+
+        legacy = legacy_match(trackers, detections)
+        double_claims = len(legacy) - len(set(legacy.values()))
+
+        print(f"{num_faces:>6} {legacy_ms:>10.3f} {vector_ms:>14.3f} "
+              f"{legacy_ms / vector_ms if vector_ms else 0:>7.1f}x {double_claims:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Frame loading shared by the benchmarks"""
+import glob
+import os
+import cv2
+import numpy as np
+
+
+def load_frames(source, max_frames):
+    """Read up to max_frames BGR frames from a video file or a directory of images"""
+    frames = []
+    if os.path.isdir(source):
+        paths = sorted(p for ext in ('*.jpg', '*.jpeg', '*.png') for p in glob.glob(os.path.join(source, ext)))
+        for path in paths[:max_frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+    else:
+        cap = cv2.VideoCapture(source)
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+
+def synthetic_frames(resolution, count, rng):
+    """Smooth color gradients with noise and a color cast, so white balance has work to do"""
+    w, h = resolution
+    xs = np.linspace(0, 1, w, dtype=np.float32)[None, :]
+    ys = np.linspace(0, 1, h, dtype=np.float32)[:, None]
+    frames = []
+    for _ in range(count):
+        cast = rng.uniform(0.7, 1.1, 3)
+        channels = [(xs * 180 + ys * 60) * cast[0], (ys * 200 + 20) * cast[1], ((1 - xs) * 160 + ys * 40) * cast[2]]
+        base = np.stack([np.broadcast_to(c, (h, w)) for c in channels], axis=-1)
+        noise = rng.normal(0, 12, (h, w, 3))
+        frames.append(np.clip(base + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def write_frames(frames, directory):
+    """Save frames as numbered JPEGs, e.g. to replay them through OptimizedVideoService"""
+    os.makedirs(directory, exist_ok=True)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(directory, f"{i:06d}.jpg"), frame)
+    return directory
@@ -4,6 +4,8 @@ import socket
 import logging
 from app.services.optimized_video_service import OptimizedVideoService
 from app.services.optimized_face_service import OptimizedFaceService
+from app.services.stream_hub import MJPEGBroadcastHub
+from app.services.metrics import registry
 from app.config import Config
 
 logger = logging.getLogger(__name__)
@@ -28,32 +30,59 @@ def main():
     app = create_app()
 
     # Get configuration settings
-    rtsp_url = Config.RTSP_URL
-    logger.info(f"Using camera source: {rtsp_url if rtsp_url else 'Default Camera'}")
-
-    # Initialize optimized services with settings for office environment
-    video_service = OptimizedVideoService(
-        rtsp_url=rtsp_url,
-        resolution=(1280, 720),  # Higher resolution for better face recognition
-        fps=20  # Higher FPS for smoother video
-    )
+    cameras = Config.CAMERAS
+    for camera_id, source in cameras:
+        logger.info(f"Using camera {camera_id}: {source if source != '' else 'Default Camera'}")
+
+    # Initialize one capture pipeline per camera with settings for office environment
+    video_services = {
+        camera_id: OptimizedVideoService(
+            rtsp_url=source,
+            resolution=(1280, 720),  # Higher resolution for better face recognition
+            fps=20,  # Higher FPS for smoother video
+            camera_id=camera_id,
+            fallback_to_webcam=len(cameras) == 1,  # Several entrances must not all fall back to one webcam
+            motion_detection=Config.MOTION_GATING,
+            replay_realtime=Config.REPLAY_REALTIME,
+            replay_loop=Config.REPLAY_LOOP
+        )
+        for camera_id, source in cameras
+    }
 
     # Initialize face service with app context
-    face_service = OptimizedFaceService(app=app)
+    face_service = OptimizedFaceService(
+        app=app,
+        embedding_workers=Config.EMBEDDING_WORKERS,
+        detection_interval=Config.DETECTION_INTERVAL,
+        gallery_snapshot_dir=Config.GALLERY_SNAPSHOT_DIR
+    )
 
-    # Start video service first (doesn't need app context)
-    logger.info("Starting video capture service...")
-    video_service.start()
+    # Start video services first (don't need app context)
+    logger.info("Starting video capture services...")
+    for video_service in video_services.values():
+        video_service.start()
 
     # Store services in app config and start face service within app context
     with app.app_context():
         logger.info("Starting face recognition service...")
-        # Start face service within app context
-        face_service.start(video_service.frame_queue)
+        # One face service recognises every camera with a shared gallery and workers
+        face_service.start({camera_id: video_service.frame_slot
+                            for camera_id, video_service in video_services.items()})
+
+        # One hub per camera renders and encodes its stream for every viewer
+        stream_hubs = {camera_id: MJPEGBroadcastHub(video_service, face_service)
+                       for camera_id, video_service in video_services.items()}
+        for stream_hub in stream_hubs.values():
+            stream_hub.start()
+
+        # Service stats are read into /metrics at scrape time
+        for service in [*video_services.values(), face_service, *stream_hubs.values()]:
+            registry.add_collector(service.collect_metrics)
 
         # Store services in app config for access in routes
-        app.config['video_service'] = video_service
+        app.config['video_services'] = video_services
         app.config['face_service'] = face_service
+        app.config['stream_hubs'] = stream_hubs
 
         # Log system status
         logger.info(f"System initialized with {len(face_service.employee_profiles)} employee profiles")
@@ -71,7 +100,10 @@ def main():
 
     if not selected_port:
         logger.error("No available ports. Exiting.")
-        video_service.stop()
+        for stream_hub in stream_hubs.values():
+            stream_hub.stop()
+        for video_service in video_services.values():
+            video_service.stop()
         face_service.stop()
         return
 
@@ -80,8 +112,9 @@ def main():
         logger.info(f"Starting web server on http://{host}:{selected_port}")
         logger.info(f"Admin interface available at http://localhost:{selected_port}/admin")
 
-        # Use more threads for better performance with multiple clients
-        serve(app, host=host, port=selected_port, threads=8)
+        # Use more threads for better performance with multiple clients;
+        # every open camera stream holds one thread
+        serve(app, host=host, port=selected_port, threads=max(8, 4 * len(video_services) + 4))
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
     except Exception as e:
@@ -91,7 +124,10 @@ def main():
     finally:
         # Clean shutdown
         logger.info("Shutting down services...")
-        video_service.stop()
+        for stream_hub in stream_hubs.values():
+            stream_hub.stop()
+        for video_service in video_services.values():
+            video_service.stop()
         face_service.stop()
         logger.info("System shutdown complete")
 